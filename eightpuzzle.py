@@ -8,50 +8,95 @@
 
 import search
 import random
+import collections
+import util
 
 # Module Classes
 
-class EightPuzzleState:
+SLIDING_PUZZLE_BOARDS = {}
+
+class SlidingPuzzleBoard:
     """
-    The Eight Puzzle is described in the course textbook on
-    page 64.
+    The geometry shared by every state of a side x side sliding puzzle.
+    Positions are numbered row by row, and the goal puts tile t at position
+    t, so the blank ends up in the top-left corner.
+
+    A configuration is packed into one integer, 'bits' bits per tile, and
+    the tile at position p sits in bits p * bits and up.  'moves' lists the
+    (move, new blank position) pairs for each position of the blank, and
+    'distances[tile][position]' is the Manhattan distance of a tile from its
+    goal position.
+    """
+    def __init__(self, side):
+        self.side = side
+        self.numCells = side * side
+        self.bits = (self.numCells - 1).bit_length()
+        self.mask = (1 << self.bits) - 1
+        self.moves = []
+        for blank in range(self.numCells):
+            row, col = divmod(blank, side)
+            moves = []
+            if row != 0: moves.append(('up', blank - side))
+            if row != side - 1: moves.append(('down', blank + side))
+            if col != 0: moves.append(('left', blank - 1))
+            if col != side - 1: moves.append(('right', blank + 1))
+            self.moves.append(moves)
+        self.distances = [[0] * self.numCells]
+        for tile in range(1, self.numCells):
+            self.distances.append([abs(tile // side - p // side) + abs(tile % side - p % side) for p in range(self.numCells)])
+        self.goal = self.pack(range(self.numCells))
+
+    def pack(self, tiles):
+        packed = 0
+        for position, tile in enumerate(tiles):
+            packed |= tile << (self.bits * position)
+        return packed
+
+    def unpack(self, packed):
+        return [(packed >> (self.bits * position)) & self.mask for position in range(self.numCells)]
+
+def getSlidingPuzzleBoard(side):
+    "Returns the SlidingPuzzleBoard for a side, shared by every puzzle of that size"
+    if side not in SLIDING_PUZZLE_BOARDS:
+        SLIDING_PUZZLE_BOARDS[side] = SlidingPuzzleBoard(side)
+    return SLIDING_PUZZLE_BOARDS[side]
+
+class SlidingPuzzleState(object):
+    """
+    A configuration of a side x side sliding puzzle: the eight puzzle, the
+    fifteen puzzle, the twenty-four puzzle and so on.
 
-    This class defines the mechanics of the puzzle itself.  The
-    task of recasting this puzzle as a search problem is left to
-    the EightPuzzleSearchProblem class.
+    The configuration is packed into the integer 'packed' (see
+    SlidingPuzzleBoard), which keeps states small and makes hashing and
+    comparison cheap.  'cells' and 'blankLocation' are views computed on
+    demand for display.
     """
+    __slots__ = ('board', 'packed', 'blank')
 
-    def __init__( self, numbers ):
+    def __init__( self, numbers, side=None ):
         """
-          Constructs a new eight puzzle from an ordering of numbers.
+        numbers: the tile at each position, row by row, with 0 for the blank
+        side: the width of the board; by default the square root of the
+          number of tiles
+        """
+        numbers = list(numbers)
+        if side == None: side = int(round(len(numbers) ** 0.5))
+        if sorted(numbers) != range(side * side):
+            raise ValueError('%s is not a %d x %d sliding puzzle' % (numbers, side, side))
+        self.board = getSlidingPuzzleBoard(side)
+        self.packed = self.board.pack(numbers)
+        self.blank = numbers.index(0)
 
-        numbers: a list of integers from 0 to 8 representing an
-          instance of the eight puzzle.  0 represents the blank
-          space.  Thus, the list
+    def getTiles( self ):
+        "Returns the tile at each position, row by row, with 0 for the blank"
+        return self.board.unpack(self.packed)
 
-            [1, 0, 2, 3, 4, 5, 6, 7, 8]
+    def _getCells( self ):
+        tiles, side = self.getTiles(), self.board.side
+        return [tiles[row * side:row * side + side] for row in range(side)]
 
-          represents the eight puzzle:
-            -------------
-            | 1 |   | 2 |
-            -------------
-            | 3 | 4 | 5 |
-            -------------
-            | 6 | 7 | 8 |
-            ------------
-
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
-        """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+    cells = property(_getCells, doc="The configuration as a list of rows")
+    blankLocation = property(lambda self: divmod(self.blank, self.board.side), doc="The (row, col) of the blank")
 
     def isGoal( self ):
         """
@@ -71,13 +116,32 @@ class EightPuzzleState:
         >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
         False
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == self.board.goal
+
+    def isSolvable( self ):
+        """
+        Checks in linear time whether the goal can be reached at all.  Every
+        move swaps the blank with a neighbour, which flips both the parity of
+        the permutation of the cells and the parity of the blank's distance
+        from its goal corner.  The two agree in the goal, so they must agree
+        in every solvable configuration, and every configuration where they
+        agree is solvable.
+
+        >>> EightPuzzleState([0, 2, 1, 3, 4, 5, 6, 7, 8]).isSolvable()
+        False
+        """
+        tiles = self.getTiles()
+        seen = [False] * len(tiles)
+        cycles = 0
+        for start in range(len(tiles)):
+            if seen[start]: continue
+            cycles += 1
+            position = start
+            while not seen[position]:
+                seen[position] = True
+                position = tiles[position]
+        row, col = self.blankLocation
+        return (len(tiles) - cycles) % 2 == (row + col) % 2
 
     def legalMoves( self ):
         """
@@ -89,87 +153,81 @@ class EightPuzzleState:
         >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
         ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
-        if(row != 2):
-            moves.append('down')
-        if(col != 0):
-            moves.append('left')
-        if(col != 2):
-            moves.append('right')
-        return moves
+        return [move for move, blank in self.board.moves[self.blank]]
 
     def result(self, move):
         """
-          Returns a new eightPuzzle with the current state and blankLocation
+          Returns a new puzzle with the current state and blankLocation
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
-        return newPuzzle
+        for legalMove, blank in self.board.moves[self.blank]:
+            if legalMove == move:
+                return self._slide(blank)
+        raise Exception("Illegal Move")
+
+    def successors(self, previousMove=None):
+        """
+        Returns a list of (successor, move) pairs for every legal move,
+        leaving out the move that would undo previousMove.
+        """
+        skip = OPPOSITE_MOVES.get(previousMove)
+        return [(self._slide(blank), move) for move, blank in self.board.moves[self.blank] if move != skip]
+
+    def _slide(self, blank):
+        "The state reached by sliding the tile at position 'blank' into the blank"
+        shift = self.board.bits * blank
+        tile = (self.packed >> shift) & self.board.mask
+        puzzle = self.__class__.__new__(self.__class__)
+        puzzle.board = self.board
+        puzzle.packed = self.packed - (tile << shift) + (tile << (self.board.bits * self.blank))
+        puzzle.blank = blank
+        return puzzle
 
     # Utilities for comparison and display
     def __eq__(self, other):
         """
-            Overloads '==' such that two eightPuzzles with the same configuration
+            Overloads '==' such that two puzzles with the same configuration
           are equal.
 
           >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]) == \
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return isinstance(other, SlidingPuzzleState) and self.packed == other.packed and self.board is other.board
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
+
+    def __getstate__(self):
+        return self.board.side, self.packed, self.blank
+
+    def __setstate__(self, state):
+        side, self.packed, self.blank = state
+        self.board = getSlidingPuzzleBoard(side)
 
     def __getAsciiString(self):
         """
           Returns a display string for the maze
         """
+        width = len(str(self.board.numCells - 1))
         lines = []
-        horizontalLine = ('-' * (13))
+        horizontalLine = ('-' * (1 + (width + 3) * self.board.side))
         lines.append(horizontalLine)
         for row in self.cells:
             rowLine = '|'
             for col in row:
                 if col == 0:
-                    col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                    col = ''
+                rowLine = rowLine + ' ' + str(col).rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
         return '\n'.join(lines)
@@ -177,20 +235,60 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
-# TODO: Implement The methods in this class
+class EightPuzzleState(SlidingPuzzleState):
+    """
+    The Eight Puzzle is described in the course textbook on
+    page 64.
 
-class EightPuzzleSearchProblem(search.SearchProblem):
+    This class defines the mechanics of the puzzle itself.  The
+    task of recasting this puzzle as a search problem is left to
+    the EightPuzzleSearchProblem class.  The mechanics are those of
+    SlidingPuzzleState on a 3 x 3 board.
     """
-      Implementation of a SearchProblem for the  Eight Puzzle domain
+    __slots__ = ()
 
-      Each state is represented by an instance of an eightPuzzle.
+    def __init__( self, numbers ):
+        """
+          Constructs a new eight puzzle from an ordering of numbers.
+
+        numbers: a list of integers from 0 to 8 representing an
+          instance of the eight puzzle.  0 represents the blank
+          space.  Thus, the list
+
+            [1, 0, 2, 3, 4, 5, 6, 7, 8]
+
+          represents the eight puzzle:
+            -------------
+            | 1 |   | 2 |
+            -------------
+            | 3 | 4 | 5 |
+            -------------
+            | 6 | 7 | 8 |
+            ------------
+
+        The configuration of the puzzle is stored in the packed integer
+        'packed' and the position of the blank in 'blank'.
+        """
+        SlidingPuzzleState.__init__(self, numbers, 3)
+
+class SlidingPuzzleSearchProblem(search.SearchProblem):
     """
-    def __init__(self,puzzle):
-        "Creates a new EightPuzzleSearchProblem which stores search information."
+    A SearchProblem for sliding puzzles of any size, where each state is a
+    SlidingPuzzleState and every move costs 1.  Unsolvable puzzles are
+    rejected when the problem is created, before any search starts.
+    """
+    priorityQueue = 'buckets' # Every move costs 1 (see search.SearchProblem)
+
+    def __init__(self, puzzle):
+        if not puzzle.isSolvable():
+            raise ValueError('This puzzle cannot be solved:\n%s' % puzzle)
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
+
+    def getGoalState(self):
+        return SlidingPuzzleState(range(self.puzzle.board.numCells))
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -201,10 +299,19 @@ class EightPuzzleSearchProblem(search.SearchProblem):
           each succesor is either left, right, up, or down
           from the original state and the cost is 1.0 for each
         """
-        succ = []
-        for a in state.legalMoves():
-            succ.append((state.result(a), a, 1))
-        return succ
+        return [(successor, move, 1) for successor, move in state.successors()]
+
+    def getSuccessorsAfter(self, state, action):
+        "Like getSuccessors, but leaves out the move that undoes 'action'"
+        return [(successor, move, 1) for successor, move in state.successors(action)]
+
+    def getPredecessors(self,state):
+        """
+          Returns list of (predecessor, action, stepCost) triples.  Every
+          move can be undone by the opposite move, so each predecessor is
+          one move away and 'action' is the opposite of that move.
+        """
+        return [(predecessor, OPPOSITE_MOVES[move], 1) for predecessor, move in state.successors()]
 
     def getCostOfActions(self, actions):
         """
@@ -215,6 +322,22 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         """
         return len(actions)
 
+class EightPuzzleSearchProblem(SlidingPuzzleSearchProblem):
+    """
+      Implementation of a SearchProblem for the  Eight Puzzle domain
+
+      Each state is represented by an instance of an eightPuzzle.
+      Unsolvable puzzles are rejected as in SlidingPuzzleSearchProblem.
+    """
+    def __init__(self,puzzle):
+        "Creates a new EightPuzzleSearchProblem which stores search information."
+        SlidingPuzzleSearchProblem.__init__(self, puzzle)
+
+    def getGoalState(self):
+        return EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8])
+
+OPPOSITE_MOVES = {'up': 'down', 'down': 'up', 'left': 'right', 'right': 'left'}
+
 EIGHT_PUZZLE_DATA = [[1, 0, 2, 3, 4, 5, 6, 7, 8],
                      [1, 7, 8, 2, 3, 4, 5, 6, 0],
                      [4, 3, 2, 7, 0, 5, 1, 6, 8],
@@ -256,6 +379,211 @@ def createRandomEightPuzzle(moves=100):
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+def createRandomSlidingPuzzle(side, moves=100):
+    """
+    Creates a random side x side sliding puzzle by applying 'moves' random
+    moves to a solved puzzle.
+    """
+    puzzle = SlidingPuzzleState(range(side * side))
+    for i in range(moves):
+        puzzle = puzzle.result(random.choice(puzzle.legalMoves()))
+    return puzzle
+
+def manhattanPuzzleHeuristic(state, problem=None):
+    "The sum of the Manhattan distances of the tiles from their goal positions"
+    distances = state.board.distances
+    return sum([distances[tile][position] for position, tile in enumerate(state.getTiles())])
+
+# Pattern databases
+
+PATTERN_DATABASE_CACHE = {}
+ADDITIVE_PATTERN_DATABASE_CACHE = {}
+
+EIGHT_PUZZLE_PARTITION = [(1, 2, 3, 4), (5, 6, 7, 8)]
+
+class PatternDatabase:
+    """
+    Exact solution costs of a sliding-tile puzzle abstracted to a subset of
+    its tiles (the pattern).
+
+    All other tiles are treated as indistinguishable, and only moves of
+    pattern tiles are counted.  This is what makes the databases of
+    disjoint patterns additive.  There is one byte per placement of the
+    pattern tiles, minimised over every position of the blank, and the
+    entries are indexed by the rank of the placement.
+
+    Positions are numbered row by row on a board 'side' cells wide, and the
+    goal puts tile t at position t.  The table is built with one backward
+    breadth-first search from the goal and saved in the on-disk cache (see
+    util.getCachePath), so later runs memory-map it instead.
+    """
+    MAGIC = 'PDB1'
+    UNKNOWN = 0xFF
+
+    def __init__(self, side, pattern):
+        self.side = side
+        self.numCells = side * side
+        self.pattern = tuple(pattern)
+        if 0 in self.pattern: raise ValueError('The blank cannot be part of a pattern')
+        self.size = 1
+        for i in range(len(self.pattern)):
+            self.size *= self.numCells - i
+        filename = 'patternDatabase-%d-%s.bin' % (side, '-'.join([str(tile) for tile in self.pattern]))
+        self.table = util.loadCachedTable(filename, PatternDatabase.MAGIC, self.size, self.size)
+        if self.table == None:
+            table = self._build()
+            util.saveCachedTable(filename, PatternDatabase.MAGIC, self.size, table)
+            self.table = str(table) # Index like the memory map: one character per entry
+
+    def rank(self, positions):
+        "Returns the table index for the positions of the pattern tiles, in pattern order"
+        return rankArrangement(positions, self.numCells)
+
+    def getCost(self, positions):
+        "Returns the number of pattern-tile moves needed to put the pattern tiles in place"
+        return ord(self.table[self.rank(positions)])
+
+    def _build(self):
+        "A 0-1 breadth-first search over placements of the pattern tiles and the blank"
+        n = self.numCells
+        neighbors = []
+        for cell in range(n):
+            row, col = divmod(cell, self.side)
+            adjacent = [(row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)]
+            neighbors.append([r * self.side + c for r, c in adjacent if 0 <= r < self.side and 0 <= c < self.side])
+        table = bytearray([PatternDatabase.UNKNOWN]) * self.size
+        best = bytearray([PatternDatabase.UNKNOWN]) * (self.size * n)
+        start = self.pattern
+        best[self.rank(start) * n] = 0
+        queue = collections.deque([(start, 0, 0)])
+        while queue:
+            positions, blank, cost = queue.popleft()
+            rank = self.rank(positions)
+            if best[rank * n + blank] < cost: continue
+            if cost < table[rank]: table[rank] = cost
+            for cell in neighbors[blank]:
+                if cell in positions:
+                    # Sliding a pattern tile into the blank is a counted move
+                    i = positions.index(cell)
+                    moved = positions[:i] + (blank,) + positions[i + 1:]
+                    index = self.rank(moved) * n + cell
+                    if cost + 1 < best[index]:
+                        best[index] = cost + 1
+                        queue.append((moved, cell, cost + 1))
+                else:
+                    index = rank * n + cell
+                    if cost < best[index]:
+                        best[index] = cost
+                        queue.appendleft((positions, cell, cost))
+        return table
+
+class AdditivePatternDatabase:
+    """
+    The sum of the pattern databases for a partition of the tiles into
+    disjoint patterns.  Every move shifts a single tile and is counted in
+    one database at most, so the sum is an admissible heuristic.
+    """
+    def __init__(self, side, partition):
+        self.side = side
+        self.databases = [getPatternDatabase(side, pattern) for pattern in partition]
+
+    def getValue(self, tiles):
+        "tiles: the tile at each position, row by row, with 0 for the blank"
+        where = [0] * len(tiles)
+        for position, tile in enumerate(tiles):
+            where[tile] = position
+        return sum([database.getCost([where[tile] for tile in database.pattern]) for database in self.databases])
+
+def rankArrangement(values, n):
+    """
+    Returns the index of an arrangement of distinct values drawn from
+    range(n) among all arrangements of that length, from 0 up to
+    n! / (n - len(values))!.  For a full permutation this is its Lehmer
+    rank.
+    """
+    rank = 0
+    for i, value in enumerate(values):
+        smaller = len([v for v in values[:i] if v < value])
+        rank = rank * (n - i) + value - smaller
+    return rank
+
+def getPatternDatabase(side, pattern):
+    "Returns the PatternDatabase for a pattern, building or loading it at most once per process"
+    key = (side, tuple(pattern))
+    if key not in PATTERN_DATABASE_CACHE:
+        PATTERN_DATABASE_CACHE[key] = PatternDatabase(side, pattern)
+    return PATTERN_DATABASE_CACHE[key]
+
+def getAdditivePatternDatabase(side, partition):
+    """
+    Returns the AdditivePatternDatabase for a partition of the tiles of a
+    side x side puzzle, for instance [(1, 2, 3, 4, 5), (6, 7, 8, 9, 10),
+    (11, 12, 13, 14, 15)] for the fifteen puzzle.
+    """
+    key = (side, tuple([tuple(pattern) for pattern in partition]))
+    if key not in ADDITIVE_PATTERN_DATABASE_CACHE:
+        ADDITIVE_PATTERN_DATABASE_CACHE[key] = AdditivePatternDatabase(side, partition)
+    return ADDITIVE_PATTERN_DATABASE_CACHE[key]
+
+def eightPuzzleHeuristic(state, problem=None):
+    """
+    An admissible heuristic for EightPuzzleSearchProblem, which adds up the
+    pattern databases for the tiles in EIGHT_PUZZLE_PARTITION.
+    """
+    return getAdditivePatternDatabase(3, EIGHT_PUZZLE_PARTITION).getValue(state.getTiles())
+
+# Exact distances
+
+EIGHT_PUZZLE_DISTANCES = None
+
+class EightPuzzleDistances:
+    """
+    The exact number of moves from every solvable eight puzzle to the goal.
+
+    All 181,440 solvable configurations are labelled by one
+    search.layeredBreadthFirstSearch backward from the goal.  Each gets one
+    byte, indexed by the rank of its tiles (see rankArrangement), and the
+    other half of the 9! ranks keep search.UNREACHED_DEPTH.  The table is
+    saved in the on-disk cache (see util.getCachePath), so later runs
+    memory-map it instead.
+    """
+    MAGIC = 'EPD1'
+    SIZE = 362880
+
+    def __init__(self, workers=0):
+        filename = 'eightPuzzleDistances.bin'
+        self.table = util.loadCachedTable(filename, EightPuzzleDistances.MAGIC, EightPuzzleDistances.SIZE, EightPuzzleDistances.SIZE)
+        if self.table == None:
+            problem = EightPuzzleSearchProblem(EightPuzzleState(range(9)))
+            rank = lambda state: rankArrangement(state.getTiles(), 9)
+            table = search.layeredBreadthFirstSearch(problem, rank, EightPuzzleDistances.SIZE, True, workers)
+            util.saveCachedTable(filename, EightPuzzleDistances.MAGIC, EightPuzzleDistances.SIZE, table)
+            self.table = str(table) # Index like the memory map: one character per entry
+
+    def getDistance(self, state):
+        "Returns the fewest moves that solve the puzzle, or None if it cannot be solved"
+        distance = ord(self.table[rankArrangement(state.getTiles(), 9)])
+        if distance == search.UNREACHED_DEPTH: return None
+        return distance
+
+def getEightPuzzleDistances():
+    "Returns the EightPuzzleDistances, building or loading them at most once per process"
+    global EIGHT_PUZZLE_DISTANCES
+    if EIGHT_PUZZLE_DISTANCES == None:
+        EIGHT_PUZZLE_DISTANCES = EightPuzzleDistances()
+    return EIGHT_PUZZLE_DISTANCES
+
+def eightPuzzleDistanceHeuristic(state, problem=None):
+    """
+    The perfect heuristic for EightPuzzleSearchProblem: the exact number of
+    moves left, from EightPuzzleDistances.  A* with it expands only states
+    on an optimal path, and it is the reference for checking other
+    heuristics for admissibility.  Unsolvable puzzles get infinity.
+    """
+    distance = getEightPuzzleDistances().getDistance(state)
+    if distance == None: return float('inf')
+    return distance
+
 if __name__ == '__main__':
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
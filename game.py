@@ -141,82 +141,110 @@ class AgentState:                        #[REF 114]# AgentState takes the initia
     def getDirection(self):
         return self.configuration.getDirection()
 
-class Grid: ##This class is initiated through a function call situated within the __init__ function of the Layout class. The class objects Layout.width, layout.height are passed to the Grid__init__function as width and height variables. 
+class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans.  Data is accessed via grid[x][y] where
+    (x,y) are positions on a Pacman map with x horizontal, y vertical and the
+    origin (0,0) in the bottom left corner.
+
+    The cells are packed into the bits of a single integer, self.bits, with
+    cell (x,y) stored at bit x * height + y.  Since that integer is immutable,
+    copying a Grid only copies a reference, hashing and equality work on one
+    number, and count() is a popcount.
+
+    freeze() makes a grid read-only.  Grids that are shared (the walls and
+    food of a Layout) or used as dictionary keys are frozen, and copy()
+    returns a writable grid.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
-        self.CELLS_PER_INT = 30 ## 
-        
-        self.width = width ## the Grid object instance uses the Layout.width and layout height variables as the height and width objects of the Grid class.
+        self.CELLS_PER_INT = 30
+
+        self.width = width
         self.height = height
-        ##[REF112]: self.data is being called by many functions. Amongst others it is directly called by pacman.py's GameState.initialize function.
-        self.data = [[initialValue for y in range(height)] for x in range(width)] ##So this creates a 2-dimensional array that looks something like this: [[False, False, False, False][False, False, False, False]] Why do we do it that way around? Because when invoking the __str__ initializer we are going to work with a nexted list comprehension again to walk through the 2D array. SEE seperate file: 'GRID_TEXT' for example.
-        ## NOTE: The two dimensional array lies on its side. Height extends to the left and width extends to the top. Thi is later corrected below [REF-113].
+        self.frozen = False
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+        else:
+            self.bits = 0
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
-    def __getitem__(self, i): ##So __getitem__ and __setitem__ are usually standard methods Python calls for you. These are working behind the scenes and are defined in the background. But just as easily as these are defined for your behind the scenes you can redefine them to give them a more customized functionality. This is what is happening here.
-        return self.data[i]   ## Here we will make sure that if we call for the value of the self.data array we will make sure it returns the value that can be found at the requested key.
+    def __getitem__(self, i):
+        if i < 0: i += self.width
+        if not 0 <= i < self.width: raise IndexError('Grid index out of range')
+        return _GridColumn(self, i)
 
-    def __setitem__(self, key, item):
-        self.data[key] = item ## Here we define the bahviour of the self.data object to ensure that if we wanted to add something, we can. Is THIS LIKE A DICTIONARY?
+    def __iter__(self):
+        for x in range(self.width):
+            yield _GridColumn(self, x)
 
-    def __str__(self):        ## The __str__ function returns the Grid objects self.width, self.height, self.data in a string format.
-        out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)] ## Makes the 2-dimensional array into: ['F', 'F', 'F', 'F', 'F', 'F'], ['F', 'F', 'F', 'F', 'F', 'F'], ['F', 'F', 'F', 'F', 'F', 'F'], ['F', 'F', 'F', 'F', 'F', 'F'], ['F', 'F', 'F', 'F', 'F', 'F']]
-        ## [REF-113] NOTE: This actually transforms the 2D array which used to lie on its right side into the propper 2D array standing up. 
-        out.reverse() #reverses the oder of with the last row of the two dimensional array becoming the first row.
-        return '\n'.join([''.join(x) for x in out]) #every line is appended with a space '' followed by a line-break with '\n'
-        # This turns the Grid into a chessboard of F's by using the \n demarcator.
-        ## F F F F F
-        ## F F F F F
-        ## F F F F F
-        ## F F F F F
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
 
-    def __eq__(self, other): # The __eq__ method compares other instances of the class with itself
-        if other == None: return False
-        return self.data == other.data # This highlights that it may be TRUE or FALSE?
+    def __eq__(self, other):
+        if not isinstance(other, Grid): return False
+        return self.bits == other.bits and self.width == other.width and self.height == other.height
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
     def __hash__(self):
-        '''The __hash__() function just returns an integer. It is called from the built-in function hash().
-         The key property of the hash function is that if two boards are equivalent, calling __hash__ on them will give the same number. If the boards are different, it is good (but not required) for their hashes to be different.
-         Hash functions are most commonly used by hashtables, but the hash function itself does not create or use a hashtable. The call to hash(h) simply converts h from a possibly huge number to a 32 bit integer.'''
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(self.bits)
+
+    def __getstate__(self):
+        "Pickles as just the size, the bits and whether the grid is frozen"
+        return (self.width, self.height, self.bits, self.frozen)
+
+    def __setstate__(self, state):
+        self.CELLS_PER_INT = 30
+        if isinstance(state, dict):
+            # Pickled by an older version as the instance __dict__, so old game recordings still load
+            self.width, self.height = state['width'], state['height']
+            self.bits = state.get('bits', 0)
+            for x, column in enumerate(state.get('data', [])):
+                for y, value in enumerate(column):
+                    if value: self.bits |= 1 << (x * self.height + y)
+            self.frozen = state.get('frozen', False)
+            return
+        self.width, self.height, self.bits = state[:3]
+        self.frozen = len(state) > 3 and state[3]
+
+    def freeze(self):
+        "Makes the grid read-only: writing a cell afterwards raises a TypeError"
+        self.frozen = True
 
     def copy(self):
+        "Returns a writable copy of the grid"
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g.bits = self.bits
         return g
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
-        return g
+        "The bits are immutable, so a shallow copy is the same as a copy"
+        return self.copy()
 
     def count(self, item =True ):
-        return sum([x.count(item) for x in self.data])
+        trueCount = bin(self.bits).count('1')
+        if item: return trueCount
+        return self.width * self.height - trueCount
 
     def asList(self, key = True):
+        "Returns the positions of all cells equal to key, ordered by x and then y"
+        bits = self.bits
+        if not key: bits = ~bits & ((1 << (self.width * self.height)) - 1)
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key: list.append( (x,y) )
+        while bits:
+            lowest = bits & -bits
+            list.append(self._cellIndexToPosition(lowest.bit_length() - 1))
+            bits ^= lowest
         return list
 
     def packBits(self):
@@ -229,8 +257,7 @@ class Grid: ##This class is initiated through a function call situated within th
         currentInt = 0
         for i in range(self.height * self.width):
             bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
+            if (self.bits >> i) & 1:
                 currentInt += 2 ** bit
             if (i + 1) % self.CELLS_PER_INT == 0:
                 bits.append(currentInt)
@@ -267,6 +294,40 @@ class Grid: ##This class is initiated through a function call situated within th
                 bools.append(False)
         return bools
 
+class _GridColumn(object):
+    """
+    The column grid[x] of a Grid.  Reads and writes go straight to the bits
+    of the grid, so grid[x][y] = value updates the grid itself (unless it
+    is frozen).
+    """
+    __slots__ = ('grid', 'offset')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.offset = x * grid.height
+
+    def __getitem__(self, y):
+        if y < 0: y += self.grid.height
+        if not 0 <= y < self.grid.height: raise IndexError('Grid index out of range')
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        if y < 0: y += self.grid.height
+        if not 0 <= y < self.grid.height: raise IndexError('Grid index out of range')
+        if self.grid.frozen: raise TypeError('Cannot change a frozen Grid; change a copy() of it instead')
+        if value:
+            self.grid.bits |= 1 << (self.offset + y)
+        else:
+            self.grid.bits &= ~(1 << (self.offset + y))
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        column = self.grid.bits >> self.offset
+        for y in range(self.grid.height):
+            yield (column >> y) & 1 == 1
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -344,15 +405,7 @@ class Actions:
     def getLegalNeighbors(position, walls):
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
-        neighbors = []
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_x = x_int + dx
-            if next_x < 0 or next_x == walls.width: continue
-            next_y = y_int + dy
-            if next_y < 0 or next_y == walls.height: continue
-            if not walls[next_x][next_y]: neighbors.append((next_x, next_y))
-        return neighbors
+        return list(getMoveTable(walls).neighbors[(x_int, y_int)])
     getLegalNeighbors = staticmethod(getLegalNeighbors)
 
     def getSuccessor(position, action):
@@ -361,6 +414,58 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+MOVE_TABLE_CACHE = {}
+
+class MoveTable:
+    """
+    The moves around a walls Grid, worked out once per maze so that finding
+    the moves out of a cell is a dictionary lookup.  Every cell of the grid
+    is a key, and every position in the table is the same tuple object as
+    the key for that cell:
+
+      moves[(x, y)]:          (neighbor, action) pairs for the moves out of
+                              (x, y) into open cells, in the order north,
+                              south, east, west
+      predecessors[(x, y)]:   (neighbor, action) pairs for the moves from
+                              open neighbors into (x, y), in the same order
+                              of actions
+      neighbors[(x, y)]:      the open cells Actions.getLegalNeighbors
+                              returns for (x, y)
+      unitSuccessors[(x, y)]: the moves as (neighbor, action, 1) triples,
+                              the successors when every step costs 1
+    """
+    def __init__(self, walls):
+        self.moves, self.predecessors, self.neighbors, self.unitSuccessors = {}, {}, {}, {}
+        cells = dict([((x, y), (x, y)) for x in range(walls.width) for y in range(walls.height)])
+        def openCell(x, y):
+            if 0 <= x < walls.width and 0 <= y < walls.height and not walls[x][y]: return cells[(x, y)]
+            return None
+        actions = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+        for (x, y), cell in cells.items():
+            moves, predecessors, neighbors = [], [], []
+            for action in actions:
+                dx, dy = Actions._directions[action]
+                neighbor = openCell(x + dx, y + dy)
+                if neighbor != None: moves.append((neighbor, action))
+                neighbor = openCell(x - dx, y - dy)
+                if neighbor != None: predecessors.append((neighbor, action))
+            for action, (dx, dy) in Actions._directionsAsList:
+                neighbor = openCell(x + dx, y + dy)
+                if neighbor != None: neighbors.append(neighbor)
+            self.moves[cell] = moves
+            self.predecessors[cell] = predecessors
+            self.neighbors[cell] = neighbors
+            self.unitSuccessors[cell] = [(neighbor, action, 1) for neighbor, action in moves]
+
+def getMoveTable(walls):
+    """
+    Returns the MoveTable for a walls Grid.  The table is built at most once
+    per process for each maze; walls must not change afterwards.
+    """
+    if walls not in MOVE_TABLE_CACHE:
+        MOVE_TABLE_CACHE[walls] = MoveTable(walls)
+    return MOVE_TABLE_CACHE[walls]
+
 class GameStateData:
     """
     The GameStateData is initialised into the self.data variable, in pacman1.py's GameState __init__.
@@ -388,7 +493,7 @@ class GameStateData:
     def deepCopy( self ):                       ## What is .deepCopy()? If only copied state.food by doing state.food = self.food, both variables would still point to the same memory location.
         state = GameStateData( self )           ## The problem with that ins that, if we make changed to one, the change will automatically be reflected in the variable we copied to as it points to the same pice of memnory.  this changes. 
         state.food = self.food.deepCopy()       ## This is different with deepCopy() created a new object with different memory locations. 
-        state.layout = self.layout.deepCopy()   ## This means that changing one variable will in no way affect the other variable, as neither the variable itself nor the object points to the same memory address.
+        state.layout = self.layout              ## The layout never changes during a game, so every copy shares the same Layout object instead of reparsing it.
         state._agentMoved = self._agentMoved    ## Its like a new variable with new content was created.
         state._foodEaten = self._foodEaten
         state._capsuleEaten = self._capsuleEaten
@@ -426,7 +531,7 @@ class GameStateData:
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[None for y in range(height)] for x in range(width)]
         if type(self.food) == type((1,2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -447,7 +552,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        rows = [''.join([map[x][y] for x in range(width)]) for y in range(height)]
+        rows.reverse()
+        return '\n'.join(rows) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr( self, hasFood, hasWall ):
         if hasFood:
@@ -8,14 +8,23 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import Directions
+import util
 import os
 import random
+import array, binascii, hashlib, struct, sys
 
 VISIBILITY_MATRIX_CACHE = {}
+MAZE_DISTANCE_CACHE = {}
 
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    Layouts are immutable once built: game states share a single Layout and
+    anything that changes during play (food, capsules) is copied out of it.
+    The walls and food grids are frozen, so writing to them raises a
+    TypeError instead of changing every game state at once.
     """
     ##[REF_LAYOUT111]:
     def __init__(self, layoutText):    ## The layoutText variable is furnished with the value of the tryToLayout function in form of a list [line1,line2,line2] of the layout file.
@@ -27,6 +36,8 @@ class Layout:
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText) ## This function takes the symbols contained in the layout files and turns them into coordinates which are then appended or assigned to the several variables that have been initialised in the code above. This happens according to the (x,y) convention used in the 2-dimensonal array that was defined in the Grid class.
+        self.walls.freeze()
+        self.food.freeze()
         self.layoutText = layoutText   ## layoutText contains a list of lines row by row containing the layout information looking something like this [%.%OG%,.%OG%.%,%%%%%%,%....%]
         # self.initializeVisibilityMatrix()
 
@@ -79,11 +90,24 @@ class Layout:
         row, col = [int(x) for x in pacPos]
         return ghostPos in self.visibility[row][col][pacDirection]
 
+    def getMazeDistances(self):
+        "Returns the all-pairs MazeDistances of this layout's walls"
+        return getMazeDistances(self.walls)
+
+    def getDistanceField(self, sources, parents=False):
+        "Returns a DistanceField from the given source position(s) over this layout's walls"
+        return DistanceField(self.walls, sources, parents)
+
     def __str__(self):
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        """
+        A Layout is never changed once it has been parsed, so every game state
+        can share the same object.  Copying returns the layout itself instead
+        of parsing the layout text again.
+        """
+        return self
 
     def processLayoutText(self, layoutText):## This function is being called from the __init__ function of the Layout class. 
         """
@@ -128,6 +152,262 @@ class Layout:
             self.agentPositions.append( (int(layoutChar), (x,y))) ##STRANGE. No layout File features this! BUT this appears to be an option the developers allowed themselves. If the layoutChar is a particular number, it will be factored into the layout of this object? --> Yes. 1  to 4 could denominate certain directions.
             self.numGhosts += 1                                   ## If the layout file contains one of these numbers, the number of Ghosts is increased by 1.
 
+class MazeDistances:
+    """
+    Exact maze distances between every pair of open cells of a walls Grid.
+
+    The table is built with one breadth-first search from every open cell and
+    stored as a flat matrix of unsigned 16-bit distances, one row per source
+    cell.  It is saved in the on-disk cache (see util.getCachePath) under a
+    hash of the maze, so later runs memory-map the file instead of searching
+    again.  After that, every query is a constant-time lookup.
+    """
+    UNREACHABLE = 0xFFFF
+    MAGIC = 'MZD1'
+
+    def __init__(self, walls):
+        self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        self.cellIndex = dict([(cell, i) for i, cell in enumerate(self.cells)])
+        self.numCells = len(self.cells)
+        self.fingerprint = hashlib.sha1(str(walls)).hexdigest()
+        filename = 'mazeDistances-%s.bin' % self.fingerprint
+        self.table = self._load(filename)
+        if self.table == None:
+            self.table = self._build()
+            self._save(filename)
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open cells, or None if no path
+        connects them.
+        """
+        distance = self.table[self.cellIndex[pos1] * self.numCells + self.cellIndex[pos2]]
+        if distance == MazeDistances.UNREACHABLE: return None
+        return distance
+
+    def _build(self):
+        n = self.numCells
+        neighbors = []
+        for x, y in self.cells:
+            adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+            neighbors.append([self.cellIndex[cell] for cell in adjacent if cell in self.cellIndex])
+        table = array.array('H', [MazeDistances.UNREACHABLE]) * (n * n)
+        for source in range(n):
+            row = source * n
+            table[row + source] = 0
+            frontier, distance = [source], 0
+            while frontier:
+                distance += 1
+                nextFrontier = []
+                for i in frontier:
+                    for j in neighbors[i]:
+                        if table[row + j] == MazeDistances.UNREACHABLE:
+                            table[row + j] = distance
+                            nextFrontier.append(j)
+                frontier = nextFrontier
+        return table
+
+    def _save(self, filename):
+        "Saves the table in little-endian order (see util.saveCachedTable)"
+        table = self.table
+        if sys.byteorder == 'big':
+            table = array.array('H', table)
+            table.byteswap()
+        util.saveCachedTable(filename, MazeDistances.MAGIC, self.numCells, table)
+
+    def _load(self, filename):
+        "Returns a view of a table saved by _save, or None if there is no usable one"
+        mapped = util.loadCachedTable(filename, MazeDistances.MAGIC, self.numCells, 2 * self.numCells ** 2)
+        if mapped == None: return None
+        return _MappedDistances(mapped)
+
+class _MappedDistances:
+    "Read-only view of the 16-bit little-endian distances in a memory-mapped table"
+    def __init__(self, mapped):
+        self.mapped = mapped
+
+    def __getitem__(self, i):
+        return struct.unpack_from('<H', self.mapped, 2 * i)[0]
+
+def getMazeDistances(walls):
+    """
+    Returns the MazeDistances for a walls Grid.  The table is loaded or built
+    at most once per process for each maze; walls must not change afterwards.
+    """
+    if walls not in MAZE_DISTANCE_CACHE:
+        MAZE_DISTANCE_CACHE[walls] = MazeDistances(walls)
+    return MAZE_DISTANCE_CACHE[walls]
+
+class DistanceField:
+    """
+    Breadth-first maze distances from a set of source cells to every cell of a
+    walls Grid.  sources is a position, or any iterable of positions (a list,
+    a set of food positions, ...); each cell gets the distance to its nearest
+    source.  Positions may be floats, like those of agents in a game state;
+    they are rounded to the nearest cell (see util.nearestPoint).
+
+    The search is a wavefront over the bits of the Grid (see Grid.bits): each
+    step expands the whole frontier at once by shifting it one cell in each
+    direction and masking out walls and cells already reached.  As they are
+    found, the cells at each distance are folded into one bit plane per bit
+    of the distances, so memory does not grow with the depth of the search.
+    Time does: every step costs a few operations on board-sized bit sets, so
+    an open 200x200 layout (about 400 steps) takes around ten milliseconds
+    with NumPy, but a 200x200 serpentine maze (about 20,000 steps) takes
+    about half a second.  The pure-Python fallback writes the cells one at a
+    time from the bit planes and is a few times slower.
+
+    self.distances holds the field in one of two forms: with NumPy installed
+    (and useNumPy left on), an int32 array of shape (width, height) indexed
+    [x, y]; otherwise an array('i') indexed x * height + y.  Walls and cells
+    no source can reach are -1.
+
+    If parents is True, self.parents holds, in the same form, the index into
+    DistanceField.DIRECTIONS of the move that takes each cell one step closer
+    to a source (-1 for sources and unreachable cells).  When several moves
+    qualify, the first one in DIRECTIONS is used.  getDistance, getDirection
+    and getPath read the field whichever form it has.
+    """
+    DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+    STEPS = {Directions.NORTH: (0, 1), Directions.SOUTH: (0, -1),
+             Directions.EAST: (1, 0), Directions.WEST: (-1, 0)}
+
+    def __init__(self, walls, sources, parents=False, useNumPy=True):
+        self.width = walls.width
+        self.height = walls.height
+        if isinstance(sources, tuple) and len(sources) == 2 and not isinstance(sources[0], tuple):
+            sources = [sources]
+        cells = [x * self.height + y for x, y in [util.nearestPoint(source) for source in sources]]
+        reached, planes, moves = self._wavefront(walls, cells)
+        numpy = None
+        if useNumPy:
+            try:
+                import numpy
+            except ImportError:
+                pass
+        self.parents = None
+        if numpy != None:
+            self.distances = self._numpyBits(numpy, reached).astype(numpy.int32) - 1
+            for bit, plane in enumerate(planes):
+                self.distances += self._numpyBits(numpy, plane).astype(numpy.int32) << bit
+            if parents: self.parents = self._numpyParents(numpy, moves)
+        else:
+            n = self.width * self.height
+            if planes:
+                # One string of 0s and 1s per plane, highest bit first; column i spells out the distance of cell i
+                digits = [bin(plane)[:1:-1].ljust(n, '0') for plane in reversed(planes)]
+                self.distances = array.array('i', [int(''.join(column), 2) for column in zip(*digits)])
+            else:
+                self.distances = array.array('i', [0]) * n
+            for i in _bitIndices(((1 << n) - 1) & ~reached):
+                self.distances[i] = -1
+            if parents:
+                self.parents = array.array('b', [-1]) * n
+                for code, bits in enumerate(moves):
+                    for i in _bitIndices(bits):
+                        self.parents[i] = code
+        self.isArray = numpy != None
+
+    def getDistance(self, pos):
+        "Returns the distance from pos to the nearest source, or None if none is reachable"
+        x, y = util.nearestPoint(pos)
+        if self.isArray: distance = int(self.distances[x, y])
+        else: distance = self.distances[x * self.height + y]
+        if distance < 0: return None
+        return distance
+
+    def getDirection(self, pos):
+        """
+        Returns the direction that takes pos one step closer to its nearest
+        source, or None at a source or an unreachable cell.  Needs parents=True.
+        """
+        x, y = util.nearestPoint(pos)
+        if self.isArray: code = int(self.parents[x, y])
+        else: code = self.parents[x * self.height + y]
+        if code < 0: return None
+        return DistanceField.DIRECTIONS[code]
+
+    def getPath(self, pos):
+        """
+        Returns the list of actions that leads from pos to its nearest source,
+        or None if no source is reachable.  Needs parents=True.
+        """
+        if self.getDistance(pos) == None: return None
+        x, y = util.nearestPoint(pos)
+        path = []
+        direction = self.getDirection((x, y))
+        while direction != None:
+            path.append(direction)
+            dx, dy = DistanceField.STEPS[direction]
+            x, y = x + dx, y + dy
+            direction = self.getDirection((x, y))
+        return path
+
+    def _wavefront(self, walls, cells):
+        """
+        Returns the cells reached, the bit planes of their distances (bit i of
+        planes[b] is set if bit b of the distance of cell i is) and the cells
+        whose parent lies in each of the DIRECTIONS, all as bit sets in
+        Grid.bits order.
+        """
+        height = self.height
+        full = (1 << (self.width * height)) - 1
+        bottom = full // ((1 << height) - 1)   # bit y = 0 of every column
+        notTop = full ^ (bottom << (height - 1))
+        notBottom = full ^ bottom
+        unvisited = full & ~walls.bits
+        frontier = 0
+        for i in cells:
+            frontier |= (1 << i) & unvisited
+        unvisited ^= frontier
+        reached = frontier
+        planes = []
+        moves = [0, 0, 0, 0]
+        distance = 0
+        while True:
+            north = (frontier >> 1) & notTop & unvisited
+            unvisited ^= north
+            south = (frontier << 1) & notBottom & unvisited
+            unvisited ^= south
+            east = (frontier >> height) & unvisited
+            unvisited ^= east
+            west = (frontier << height) & unvisited
+            unvisited ^= west
+            frontier = north | south | east | west
+            if not frontier: break
+            moves[0] |= north; moves[1] |= south; moves[2] |= east; moves[3] |= west
+            reached |= frontier
+            distance += 1
+            bit = 0
+            while distance >> bit:
+                if bit == len(planes): planes.append(0)
+                if (distance >> bit) & 1: planes[bit] |= frontier
+                bit += 1
+        return reached, planes, moves
+
+    def _numpyParents(self, numpy, moves):
+        north, south, east, west = moves
+        parents = self._numpyBits(numpy, north | south | east | west).astype(numpy.int8) - 1
+        parents += self._numpyBits(numpy, south | west).astype(numpy.int8)
+        parents += self._numpyBits(numpy, east | west).astype(numpy.int8) * 2
+        return parents
+
+    def _numpyBits(self, numpy, bits):
+        "Unpacks a bit set in Grid.bits order into a (width, height) array of 0s and 1s"
+        n = self.width * self.height
+        numBytes = (n + 7) // 8
+        raw = binascii.unhexlify('%0*x' % (2 * numBytes, bits))
+        return numpy.unpackbits(numpy.frombuffer(raw, numpy.uint8))[::-1][:n].reshape(self.width, self.height)
+
+def _bitIndices(bits):
+    "Yields the index of every set bit of bits, highest first"
+    digits = bin(bits)
+    last = len(digits) - 1
+    i = digits.find('1', 2)
+    while i >= 0:
+        yield last - i
+        i = digits.find('1', i + 1)
+
 def getLayout(name, back = 2):# This function takes a name as its argument and returns the corresponding layout from within the LAYOUT-Folder.
     if name.endswith('.lay'): # str.endswith(suffix[,start[,end]]) is part of the python Built-in Types. It returns True Return True if the string ends with the specified suffix
         layout = tryToLoad('layouts/' + name) # tryToLoad checks whether the file exists in the 'layouts' folder, opens the designated file, strips each line and returns it.
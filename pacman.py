@@ -504,7 +504,7 @@ def parseAgentArgs(str):
             key, val = p.split('=')     ## the left section will be assigned to the variable 'key' and the right will be assigned to the variable 'val'
         else:
             key,val = p, 1              ## if no equal sign can be found in the expression key will be assigned to the expression and val will be given the value 1
-        opts[key] = var                 ## the variable will be put in a dictionary, with the 'key' values designated as the dictionary keys.
+        opts[key] = val                 ## the variable will be put in a dictionary, with the 'key' values designated as the dictionary keys.
     return opts                         ## returns opts
 
 def readCommand( argv ):                ## argv belongs to the 'sys'-library and can be called through sys.argv. The function reads the console's comand line argument and passes it to a variable like so: args = sys.argv[1:] 
@@ -558,6 +558,8 @@ def readCommand( argv ):                ## argv belongs to the 'sys'-library and
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('-j', '--jobs', dest='jobs', type='int',
+                      help=default('Number of worker processes that play the games (0 uses every CPU); more than one implies -q'), default=1)
 
     #ONCE ALL THE OPTIONS HAVE BEEN DEFINED, optparse is instructed to parse the programm's command line.
     ##> The parser.parse_args() returns two values:
@@ -575,6 +577,11 @@ def readCommand( argv ):                ## argv belongs to the 'sys'-library and
     args['layout'] = layout.getLayout( options.layout ) # REF_LAYOUT111: layout.py --> This function returns the layout object that was created by the layout class via the getlayout function. This contains the height, width, walls, food, captules and agent positions etc.
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
+    # Parallel games run in worker processes that cannot share a display or carry learning between games
+    if options.jobs != 1:
+        if options.numTraining > 0: raise Exception('Training games cannot be split across parallel jobs')
+        options.quietGraphics = True
+
     # Choose a Pacman agent
     noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics) ## noKeyboard is set to TRUE if the user chooses the --replay and text- or silent graphics option.
     ##print noKeyboard
@@ -611,6 +618,7 @@ def readCommand( argv ):                ## argv belongs to the 'sys'-library and
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['jobs'] = options.jobs
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -680,7 +688,7 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, jobs=1 ):
     import __main__ ## Every Python module has it's __name__ defined and if this is '__main__', it implies that the module is being run standalone by the user and we can do corresponding appropriate actions.## When the Python interpreter reads a source file, it executes all of the code found in it. Before executing the code, it will define a few special variables. For example, if the python interpreter is running that module (the source file) as the main program, it sets the special __name__ variable to have a value "__main__". If this file is being imported from another module, __name__ will be set to the module's name.
     __main__.__dict__['_display'] = display 
     """__main__.__dict__ which is a dictionary that keeps the name and reference of objects. When you use an object, it looks in this dictionary to find out the object’s
@@ -691,10 +699,15 @@ interpreter’s scope). This is done with a simple one-line instruction:__main__
     ## Of course, when this is issued, the DO needs to be visible. It could be passed (along with any other objects you want to be made visible) as an argument to the Inter class.
 Using this, you can make all of a program’s objects available to the interpreter.
     ## This makes the instantiated display object visible int the scope of the interpreter"""
+    if jobs != 1:
+        return runGamesInParallel( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, jobs )
     rules = ClassicGameRules(timeout) #Initiates the ClassicGameRules class as an object and passes it into the variable rules [RefA01]
     games = []
+    # Per-game seeds drawn the same way as in runGamesInParallel, so a game plays out alike whatever the number of jobs
+    seeds = [random.randrange(2 ** 31) for i in range( numGames )]
 
     for i in range( numGames ):
+        random.seed(seeds[i])
         beQuiet = i < numTraining
         if beQuiet:
                 # Suppress output and graphics
@@ -708,23 +721,85 @@ Using this, you can make all of a program’s objects available to the interpret
         game.run() 
         if not beQuiet: games.append(game)
 
-        if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+        if record: recordGame( i, layout, game.moveHistory )
 
     if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print 'Average Score:', sum(scores) / float(len(scores))
-        print 'Scores:       ', ', '.join([str(score) for score in scores])
-        print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+        printSummary( [game.state.getScore() for game in games], [game.state.isWin() for game in games] )
+
+    return games
 
+def recordGame( index, layout, moveHistory ):
+    "Writes the history of game number index to a file named by the time it was played"
+    import time, cPickle
+    fname = ('recorded-game-%d' % (index + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+    f = file(fname, 'w')
+    components = {'layout': layout, 'actions': moveHistory}
+    cPickle.dump(components, f)
+    f.close()
+
+def printSummary( scores, wins ):
+    winRate = wins.count(True)/ float(len(wins))
+    print 'Average Score:', sum(scores) / float(len(scores))
+    print 'Scores:       ', ', '.join([str(score) for score in scores])
+    print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
+    print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+
+_PARALLEL_GAME = None
+
+def _playParallelGame( task ):
+    "Plays one game in a worker process of runGamesInParallel"
+    index, seed = task
+    layout, pacman, ghosts, catchExceptions, timeout = _PARALLEL_GAME
+    # Fresh agents for every game, so nothing left over from an earlier game on this worker changes the result
+    import copy
+    pacman, ghosts = copy.deepcopy( (pacman, ghosts) )
+    random.seed(seed)
+    import textDisplay
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions)
+    game.run()
+    return index, game.state, game.moveHistory
+
+def runGamesInParallel( layout, pacman, ghosts, numGames, record, catchExceptions=False, timeout=30, jobs=0 ):
+    """
+    Plays numGames games on a pool of jobs worker processes (every CPU if jobs
+    is 0) and prints the same summary as runGames.
+
+    Each game is seeded with its own number drawn from the random module
+    before any game starts, and is played by fresh copies of the agents, so
+    the outcome of game i does not depend on which worker plays it or in what
+    order.  runGames seeds its games the same way, so with -f the results are
+    the same for any number of jobs.  Nothing an agent learns carries over
+    between games.
+
+    Returns the finished Games in game order, like runGames.  They hold the
+    final state and move history of each game, with the original agents.
+    """
+    global _PARALLEL_GAME
+    import multiprocessing
+    if jobs < 1: jobs = multiprocessing.cpu_count()
+    seeds = [random.randrange(2 ** 31) for i in range( numGames )]
+    _PARALLEL_GAME = (layout, pacman, ghosts, catchExceptions, timeout)
+    pool = multiprocessing.Pool(min(jobs, max(numGames, 1)))
+    try:
+        results = pool.map( _playParallelGame, list(enumerate(seeds)), 1 )
+    finally:
+        pool.terminate()
+        _PARALLEL_GAME = None
+    results.sort()
+
+    import textDisplay
+    rules = ClassicGameRules(timeout)
+    games = []
+    for index, state, moveHistory in results:
+        game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions)
+        game.state = state
+        game.moveHistory = moveHistory
+        game.gameOver = True
+        games.append(game)
+        if record: recordGame( index, layout, moveHistory )
+    if numGames > 0:
+        printSummary( [game.state.getScore() for game in games], [game.state.isWin() for game in games] )
     return games
 
 if __name__ == '__main__':
@@ -12,6 +12,11 @@ by Pacman agents (in searchAgents.py).
 """
 
 import util
+import array, heapq, itertools, os, sys, time
+try:
+    import resource
+except ImportError:
+    resource = None
 
 class SearchProblem:
     """
@@ -21,6 +26,13 @@ class SearchProblem:
     You do not need to change anything in this class, ever.
     """
 
+    # The priority queue that uniformCostSearch and aStarSearch keep their
+    # frontier in: 'heap' (util.PriorityQueue), 'buckets' (util.BucketQueue,
+    # fastest when costs are small integers) or 'indexed'
+    # (util.IndexedPriorityQueue, which holds one node per state).  All three
+    # expand the same nodes in the same order.
+    priorityQueue = 'heap'
+
     def getStartState(self):
         """
         Returns the start state for the search problem
@@ -56,6 +68,42 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def getGoalState(self):
+        """
+        Returns the single goal state of the search problem.
+
+        Optional: only searches that work backward from the goal, such as
+        bidirectionalSearch, need it.
+        """
+        util.raiseNotDefined()
+
+    def getPredecessors(self, state):
+        """
+          state: Search state
+
+        For a given state, this should return a list of triples,
+        (predecessor, action, stepCost), where 'action' is the action that
+        leads from 'predecessor' to the current state and 'stepCost' is the
+        cost of taking it.  This is the successor function run in reverse.
+
+        Optional: only searches that work backward from the goal, such as
+        bidirectionalSearch, need it.
+        """
+        util.raiseNotDefined()
+
+    def getSuccessorsAfter(self, state, action):
+        """
+          state: Search state
+          action: The action that led to state, or None for the start state
+
+        Returns the same triples as getSuccessors, but may leave out
+        successors that are pointless right after 'action', such as the move
+        that undoes it.  Depth-first searches that do not keep a closed set,
+        such as idaStarSearch, expand with it.  By default nothing is left
+        out.
+        """
+        return self.getSuccessors(state)
+
 
 def tinyMazeSearch(problem):
     """
@@ -67,7 +115,480 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s,s,w,s,w,w,s,w]
 
-def depthFirstSearch(problem):
+class NodePool:
+    """
+    The nodes of the search tree built by graphSearch, stored column by
+    column instead of as one object per node.  A node is its index into the
+    columns:
+
+      stateIds:  the id of the state the node reaches in the pool's
+                 util.StateInterner, which may be shared with other pools
+      parents:   the index of the node's parent, or -1 for the root
+      actions:   the code of the action that led to the node; actionList
+                 holds each distinct action once, at the index of its code
+      costs:     the total path cost from the root
+      estimates: the heuristic estimate for the state, if the search
+                 computes one
+
+    A node takes 26 bytes of array storage instead of the few hundred bytes
+    of an object with its own dictionary, and each distinct state is stored
+    once however many nodes reach it.  Actions must be
+    hashable, and there can be at most 65536 distinct ones.  Nodes do not
+    carry the list of actions taken so far; getPath rebuilds it from the
+    parent indexes once, when a goal is reached.
+    """
+    def __init__(self, interner=None):
+        if interner == None: interner = util.StateInterner()
+        self.interner = interner
+        self.stateIds = array.array('i')
+        self.parents = array.array('i')
+        self.actions = array.array('H')
+        self.costs = array.array('d')
+        self.estimates = array.array('d')
+        self.actionList = []
+        self.actionCodes = {}
+
+    def add(self, state, parent=-1, action=None, cost=0):
+        "Adds a node and returns its index"
+        return self.addId(self.interner.intern(state), parent, action, cost)
+
+    def addId(self, stateId, parent=-1, action=None, cost=0):
+        "Adds a node for the state with the interned id stateId and returns its index"
+        code = self.actionCodes.get(action)
+        if code == None:
+            code = self.actionCodes[action] = len(self.actionList)
+            self.actionList.append(action)
+        self.stateIds.append(stateId)
+        self.parents.append(parent)
+        self.actions.append(code)
+        self.costs.append(cost)
+        self.estimates.append(0)
+        return len(self.stateIds) - 1
+
+    def removeLast(self):
+        "Takes back the node added last"
+        for column in [self.stateIds, self.parents, self.actions, self.costs, self.estimates]:
+            column.pop()
+
+    def getState(self, node):
+        return self.interner.states[self.stateIds[node]]
+
+    def getAction(self, node):
+        return self.actionList[self.actions[node]]
+
+    def getPath(self, node):
+        "Returns the list of actions that leads from the root to node"
+        actions = []
+        while self.parents[node] >= 0:
+            actions.append(self.actionList[self.actions[node]])
+            node = self.parents[node]
+        actions.reverse()
+        return actions
+
+    def __len__(self):
+        return len(self.stateIds)
+
+class SearchStats:
+    """
+    What one run of a search function did.  Every search in this file
+    creates one when it starts, which stores itself as problem.searchStats.
+
+      algorithm:     name of the search function
+      expanded:      states whose successors (or predecessors) were generated
+      generated:     successors generated
+      duplicates:    successors and frontier entries dropped because their
+                     state had already been reached at least as cheaply
+      peakFrontier:  most entries in the frontier at once
+      peakClosed:    most states in the closed set at once
+      successorTime: seconds spent generating successors
+      heuristicTime: seconds spent in the heuristic
+      totalTime:     seconds the whole search took
+      solutionDepth: number of actions in the path returned, or None
+      stopReason:    why the search stopped early (see SearchBudget), or None
+      distinctStates: distinct states the search reached, for searches that
+                     intern them (see util.StateInterner), or None
+
+    Searches that keep several frontiers or closed sets (bidirectional and
+    parallel searches) report the sum of their sizes.
+    """
+    FIELDS = ['algorithm', 'expanded', 'generated', 'duplicates', 'peakFrontier', 'peakClosed',
+              'successorTime', 'heuristicTime', 'totalTime', 'solutionDepth', 'stopReason', 'distinctStates']
+
+    def __init__(self, problem, algorithm):
+        self.algorithm = algorithm
+        self.expanded, self.generated, self.duplicates = 0, 0, 0
+        self.peakFrontier, self.peakClosed = 0, 0
+        self.successorTime, self.heuristicTime, self.totalTime = 0.0, 0.0, 0.0
+        self.solutionDepth, self.stopReason = None, None
+        self.distinctStates = None
+        self.startTime = time.time()
+        problem.searchStats = self
+
+    def timeSuccessors(self, function, count=True):
+        """
+        Wraps a successor (or predecessor) function so that its calls are
+        timed and, unless count is False, counted as expansions
+        """
+        def timed(*args):
+            started = time.time()
+            successors = function(*args)
+            self.successorTime += time.time() - started
+            if count:
+                self.expanded += 1
+                self.generated += len(successors)
+            return successors
+        return timed
+
+    def timeHeuristic(self, function):
+        "Wraps a heuristic so that the time spent in it is recorded"
+        def timed(*args):
+            started = time.time()
+            value = function(*args)
+            self.heuristicTime += time.time() - started
+            return value
+        return timed
+
+    def noteFrontier(self, size):
+        if size > self.peakFrontier: self.peakFrontier = size
+
+    def noteClosed(self, size):
+        if size > self.peakClosed: self.peakClosed = size
+
+    def finish(self, actions):
+        "Records the end of the search and returns actions, the search's result"
+        self.totalTime = time.time() - self.startTime
+        if isinstance(actions, list): self.solutionDepth = len(actions)
+        return actions
+
+    def add(self, other):
+        "Adds the counts, sizes and times of other, such as a worker's stats, to these"
+        for field in ['expanded', 'generated', 'duplicates', 'peakFrontier', 'peakClosed', 'successorTime', 'heuristicTime']:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def effectiveBranchingFactor(self):
+        """
+        The branching factor b that a uniform tree as deep as the solution
+        would need to contain all the generated nodes plus the root:
+        generated + 1 = 1 + b + b^2 + ... + b^depth.  None without a solution
+        of at least one step.
+        """
+        depth = self.solutionDepth
+        if not depth: return None
+        target = self.generated + 1
+        def treeSize(b):
+            size, level = 1.0, 1.0
+            for i in range(depth):
+                level *= b
+                size += level
+                if size > target: break
+            return size
+        low, high = 0.0, float(max(target, 1))
+        for i in range(100):
+            middle = (low + high) / 2
+            if treeSize(middle) < target: low = middle
+            else: high = middle
+        return (low + high) / 2
+
+    def toDict(self):
+        stats = dict([(field, getattr(self, field)) for field in self.FIELDS])
+        stats['effectiveBranchingFactor'] = self.effectiveBranchingFactor()
+        return stats
+
+    def toJSON(self):
+        import json
+        return json.dumps(self.toDict(), sort_keys=True)
+
+    def __str__(self):
+        return self.toJSON()
+
+    def resumeFrom(self, saved):
+        "Carries on from saved, the stats of the interrupted earlier part of the same search"
+        for field in ['expanded', 'generated', 'duplicates', 'peakFrontier', 'peakClosed', 'successorTime', 'heuristicTime']:
+            setattr(self, field, getattr(saved, field))
+        self.startTime -= saved.totalTime
+
+class CancellationToken:
+    """
+    Lets one thread stop searches running in another: pass the token in a
+    SearchBudget and call cancel().  To cancel searches in other processes,
+    make the token from a multiprocessing.Event shared with them.
+    """
+    def __init__(self, event=None):
+        self.event = event
+        self.cancelled = False
+
+    def cancel(self):
+        if self.event != None: self.event.set()
+        self.cancelled = True
+
+    def isCancelled(self):
+        if self.event != None: return self.event.is_set()
+        return self.cancelled
+
+class SearchBudget:
+    """
+    Limits for a search, checked before every expansion; any limit left as
+    None is not enforced.
+
+      maxExpansions: states the search may expand
+      maxTime:       seconds of wall-clock time, fractions allowed
+      maxMemory:     bytes of resident memory the whole process may use
+                     (read from /proc, or the peak from the resource module)
+      token:         a CancellationToken
+
+    A search that runs out of budget before reaching a goal returns a
+    PartialSearchResult instead of a path.  Unlike util.TimeoutFunction
+    this needs no signals, so it works off the main thread too.
+    """
+    MEMORY_CHECK_INTERVAL = 1000
+
+    def __init__(self, maxExpansions=None, maxTime=None, maxMemory=None, token=None):
+        self.maxExpansions = maxExpansions
+        self.maxTime = maxTime
+        self.maxMemory = maxMemory
+        self.token = token
+        self.start()
+
+    def start(self, expanded=0):
+        "Starts counting for a search that has already expanded expanded states"
+        self.startExpanded = expanded
+        self.nextMemoryCheck = expanded
+        self.deadline = None
+        if self.maxTime != None: self.deadline = time.time() + self.maxTime
+
+    def exceeded(self, expanded):
+        """
+        Returns why a search that has expanded expanded states must stop
+        ('cancelled', 'expansions', 'time' or 'memory'), or None
+        """
+        if self.token != None and self.token.isCancelled(): return 'cancelled'
+        if self.maxExpansions != None and expanded - self.startExpanded >= self.maxExpansions: return 'expansions'
+        if self.deadline != None and time.time() >= self.deadline: return 'time'
+        if self.maxMemory != None and expanded >= self.nextMemoryCheck:
+            self.nextMemoryCheck = expanded + self.MEMORY_CHECK_INTERVAL
+            if residentMemory() > self.maxMemory: return 'memory'
+        return None
+
+def residentMemory():
+    "Bytes of memory this process has resident, or the peak if only that is known (0 if neither is)"
+    try:
+        return int(open('/proc/self/statm').read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource == None: return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin': return peak
+    return peak * 1024
+
+class PartialSearchResult(list):
+    """
+    What a search returns when its SearchBudget runs out before it finds a
+    goal: the list of actions from the start to the most promising state it
+    reached, so an agent can still follow it, with
+
+      state:        that state
+      cost:         the cost of the actions
+      reason:       why the search stopped, as in SearchBudget.exceeded
+      frontierSize: entries left in the frontier
+      stats:        the SearchStats of the search
+
+    The most promising state is a goal on a path not yet proven cheapest if
+    the search has one, and otherwise the expanded state with the lowest
+    heuristic estimate, the costliest such state breaking ties.
+    """
+    def __init__(self, actions, state, cost, reason, frontierSize, stats):
+        list.__init__(self, actions)
+        self.state, self.cost, self.reason = state, cost, reason
+        self.frontierSize, self.stats = frontierSize, stats
+
+def _stopEarly(stats, reason, actions, state, cost, frontierSize):
+    "Records that a search ran out of budget and builds its PartialSearchResult"
+    stats.finish(None)
+    stats.stopReason = reason
+    return PartialSearchResult(actions, state, cost, reason, frontierSize, stats)
+
+def graphSearch(problem, frontier, stats=None, budget=None, checkpoint=None, pool=None):
+    """
+    The search engine shared by depthFirstSearch, breadthFirstSearch,
+    uniformCostSearch and aStarSearch.
+
+      problem:  a SearchProblem
+      frontier: an empty container of node indexes with push(node), pop()
+                and isEmpty() methods, such as a Stack, Queue or
+                PriorityQueueWithFunction from util.py.  The frontier alone
+                decides the order in which nodes are expanded; push may
+                return False to say it dropped the node.
+      stats:    the SearchStats to fill in, if the caller made one
+      budget:   an optional SearchBudget
+      checkpoint: an optional SearchCheckpoint; if its file exists the search
+                resumes from it, and it is saved regularly while searching
+      pool:     the empty NodePool that holds the nodes, if the caller made
+                one, for instance because its priority function reads it
+
+    States are closed the first time they are expanded and any later node
+    for a closed state is discarded, so each state is expanded at most once.
+    Each state is hashed once, when the pool interns it; after that the
+    closed set is a flag per state id.
+    Returns the list of actions to the first goal state popped from the
+    frontier, or None if no goal can be reached.
+    """
+    if stats == None: stats = SearchStats(problem, 'graphSearch')
+    if pool == None: pool = NodePool()
+    getSuccessors = stats.timeSuccessors(problem.getSuccessors)
+    interner = pool.interner
+    states, intern = interner.states, interner.intern
+    stateIds, costs, estimates = pool.stateIds, pool.costs, pool.estimates
+    closed, numClosed = bytearray(), 0
+    def close(stateId):
+        if stateId >= len(closed): closed.extend(bytearray(2 * len(interner) - len(closed)))
+        closed[stateId] = 1
+    if checkpoint != None and checkpoint.exists():
+        closedStates, best = _restoreGraphSearch(checkpoint.load(), problem, frontier, pool, stats)
+        for state in closedStates: close(intern(state))
+        numClosed = len(closedStates)
+    else:
+        best = pool.add(problem.getStartState())
+        frontier.push(best)
+    if budget != None: budget.start(stats.expanded)
+    while not frontier.isEmpty():
+        if budget != None:
+            reason = budget.exceeded(stats.expanded)
+            if reason != None:
+                if checkpoint != None: checkpoint.save(_saveGraphSearch(problem, frontier, pool, closed, best, stats))
+                stats.distinctStates = len(interner)
+                return _stopEarly(stats, reason, pool.getPath(best), pool.getState(best), costs[best], len(frontier))
+        if checkpoint != None and checkpoint.isDue():
+            checkpoint.save(_saveGraphSearch(problem, frontier, pool, closed, best, stats))
+        stats.noteFrontier(len(frontier))
+        node = frontier.pop()
+        stateId = stateIds[node]
+        if stateId < len(closed) and closed[stateId]:
+            stats.duplicates += 1
+            continue
+        state = states[stateId]
+        if problem.isGoalState(state):
+            if checkpoint != None: checkpoint.remove()
+            stats.distinctStates = len(interner)
+            return stats.finish(pool.getPath(node))
+        cost = costs[node]
+        if (estimates[node], -cost) < (estimates[best], -costs[best]): best = node
+        close(stateId)
+        numClosed += 1
+        stats.noteClosed(numClosed)
+        for successor, action, stepCost in getSuccessors(state):
+            successorId = intern(successor)
+            if successorId < len(closed) and closed[successorId]:
+                stats.duplicates += 1
+            elif frontier.push(pool.addId(successorId, node, action, cost + stepCost)) == False:
+                pool.removeLast() # An indexed frontier already holds the state at no higher priority
+                stats.duplicates += 1
+    if checkpoint != None: checkpoint.remove()
+    stats.distinctStates = len(interner)
+    return stats.finish(None)
+
+class SearchCheckpoint:
+    """
+    A file that a long search saves its progress to, so that it can carry on
+    after being interrupted.  Pass the same SearchCheckpoint (or one for the
+    same path) to the same search on the same problem: if the file exists,
+    the search resumes from it and expands states in exactly the order the
+    uninterrupted search would have.
+
+    The search saves every interval seconds and when its SearchBudget runs
+    out, and deletes the file once it finishes.  Saving writes a temporary
+    file and renames it over path, so a crash mid-save leaves the previous
+    checkpoint intact.  States and actions must pickle.
+    """
+    def __init__(self, path, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.lastSave = time.time()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def isDue(self):
+        return time.time() - self.lastSave >= self.interval
+
+    def save(self, progress):
+        import cPickle
+        tmpname = '%s.%d.tmp' % (self.path, os.getpid())
+        f = open(tmpname, 'wb')
+        try:
+            cPickle.dump(progress, f, cPickle.HIGHEST_PROTOCOL)
+        finally: f.close()
+        os.rename(tmpname, self.path)
+        self.lastSave = time.time()
+
+    def load(self):
+        import cPickle
+        f = open(self.path, 'rb')
+        try:
+            return cPickle.load(f)
+        finally: f.close()
+
+    def remove(self):
+        if self.exists(): os.remove(self.path)
+
+def _saveGraphSearch(problem, frontier, pool, closed, best, stats):
+    """
+    The progress of graphSearch as plain data: the frontier's nodes and their
+    ancestors copied out of the pool into parallel lists, with each parent
+    as an index into those lists, and the frontier's entries with nodes
+    renumbered the same way.  Ancestors come before their descendants.
+    Closed states are saved as a set of states, since ids do not outlive
+    the interner.
+    """
+    index, order = {}, []
+    def number(node):
+        chain, ancestor = [], node
+        while ancestor >= 0 and ancestor not in index:
+            chain.append(ancestor)
+            ancestor = pool.parents[ancestor]
+        for ancestor in reversed(chain):
+            index[ancestor] = len(order)
+            order.append(ancestor)
+        return index[node]
+    if hasattr(frontier, 'getEntries'):
+        entries = [(priority, count, number(node)) for priority, count, node in frontier.getEntries()]
+        counter = frontier.count
+    else:
+        entries = [number(node) for node in frontier.list]
+        counter = None
+    number(best)
+    parents = []
+    for node in order:
+        if pool.parents[node] >= 0: parents.append(index[pool.parents[node]])
+        else: parents.append(-1)
+    closedStates = set([pool.interner.states[stateId] for stateId in range(len(closed)) if closed[stateId]])
+    stats.totalTime = time.time() - stats.startTime
+    return {'algorithm': stats.algorithm, 'start': problem.getStartState(),
+            'states': [pool.getState(node) for node in order], 'parents': parents,
+            'actions': [pool.getAction(node) for node in order], 'costs': [pool.costs[node] for node in order],
+            'estimates': [pool.estimates[node] for node in order],
+            'frontier': entries, 'counter': counter, 'best': index[best],
+            'closed': closedStates, 'stats': stats}
+
+def _restoreGraphSearch(progress, problem, frontier, pool, stats):
+    """
+    Refills the empty frontier and pool from progress saved by
+    _saveGraphSearch and returns the set of closed states and the best
+    node.  The saved
+    nodes get the same indexes in the pool as in the saved lists.
+    """
+    if progress['algorithm'] != stats.algorithm or not progress['start'] == problem.getStartState():
+        raise Exception('The checkpoint is for a different search')
+    for i in range(len(progress['states'])):
+        pool.add(progress['states'][i], progress['parents'][i], progress['actions'][i], progress['costs'][i])
+        pool.estimates[i] = progress['estimates'][i]
+    if progress['counter'] != None:
+        frontier.setEntries(progress['frontier'], progress['counter'])
+    else:
+        frontier.list = list(progress['frontier'])
+    stats.resumeFrom(progress['stats'])
+    return progress['closed'], progress['best']
+
+def depthFirstSearch(problem, budget=None, checkpoint=None):
     """
     Search the deepest nodes in the search tree first
 
@@ -81,20 +602,30 @@ def depthFirstSearch(problem):
     print "Is the start a goal?", problem.isGoalState(problem.getStartState())
     print "Start's successors:", problem.getSuccessors(problem.getStartState())
     """
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return graphSearch(problem, util.Stack(), SearchStats(problem, 'depthFirstSearch'), budget, checkpoint)
 
-def breadthFirstSearch(problem):
+def breadthFirstSearch(problem, budget=None, checkpoint=None):
     """
     Search the shallowest nodes in the search tree first.
     """
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return graphSearch(problem, util.Queue(), SearchStats(problem, 'breadthFirstSearch'), budget, checkpoint)
 
-def uniformCostSearch(problem):
+def uniformCostSearch(problem, budget=None, checkpoint=None):
     "Search the node of least total cost first. "
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    pool = NodePool()
+    frontier = _priorityFrontier(problem, pool, lambda node: pool.costs[node])
+    return graphSearch(problem, frontier, SearchStats(problem, 'uniformCostSearch'), budget, checkpoint, pool)
+
+def _priorityFrontier(problem, pool, priority):
+    """
+    An empty frontier for nodes of pool, of the problem's kind of
+    priorityQueue (see SearchProblem), ordered by priority(node)
+    """
+    kind = getattr(problem, 'priorityQueue', 'heap')
+    if kind == 'heap': return util.PriorityQueueWithFunction(priority)
+    if kind == 'buckets': return util.BucketQueueWithFunction(priority)
+    if kind == 'indexed': return util.IndexedPriorityQueueWithFunction(priority, lambda node: pool.stateIds[node])
+    raise ValueError('Unknown priorityQueue: %r' % kind)
 
 def nullHeuristic(state, problem=None):
     """
@@ -103,10 +634,1006 @@ def nullHeuristic(state, problem=None):
     """
     return 0
 
-def aStarSearch(problem, heuristic=nullHeuristic):
-    "Search the node that has the lowest combined cost and heuristic first."
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+def memoizeHeuristic(heuristic, key=None, maxEntries=100000, maxBytes=None):
+    """
+    Wraps heuristic(state, problem) so that its value for a state is only
+    computed again once the state has dropped out of a util.LRUCache holding
+    at most maxEntries values or maxBytes bytes.  key(state) gives the
+    cache key, the state itself by default; a compact canonical key such as
+    searchAgents.foodStateKey saves memory.  The values are cached by key
+    alone, so use one wrapper per problem.
+
+    The cache, with its hit, miss and eviction counters, is available as the
+    wrapper's cache attribute:
+
+      heuristic = memoizeHeuristic(foodHeuristic, foodStateKey)
+      aStarSearch(problem, heuristic)
+      print heuristic.cache.getStats()
+    """
+    cache = util.LRUCache(maxEntries, maxBytes)
+    missing = object()
+    def memoized(state, problem):
+        if key == None: cacheKey = state
+        else: cacheKey = key(state)
+        value = cache.get(cacheKey, missing)
+        if value is missing:
+            value = heuristic(state, problem)
+            cache.put(cacheKey, value)
+        return value
+    memoized.cache = cache
+    return memoized
+
+def aStarSearch(problem, heuristic=nullHeuristic, budget=None, checkpoint=None):
+    """
+    Search the node that has the lowest combined cost and heuristic first.
+    The heuristic is computed once for each distinct state.
+    """
+    stats = SearchStats(problem, 'aStarSearch')
+    heuristic = stats.timeHeuristic(heuristic)
+    pool = NodePool()
+    known = array.array('d') # The estimate for each state id, or NaN until it is computed
+    def priority(node):
+        stateId = pool.stateIds[node]
+        if stateId >= len(known): known.extend([float('nan')] * (2 * len(pool.interner) - len(known)))
+        estimate = known[stateId]
+        if estimate != estimate:
+            estimate = known[stateId] = heuristic(pool.interner.states[stateId], problem)
+        pool.estimates[node] = estimate
+        return pool.costs[node] + estimate
+    return graphSearch(problem, _priorityFrontier(problem, pool, priority), stats, budget, checkpoint, pool)
+
+def multiGoalSearch(problem, goals, budget=None):
+    """
+    Uniform cost search from the start state that keeps going until every
+    state in goals has been reached by a cheapest path, instead of stopping
+    at the first goal.  problem.isGoalState is not used.
+
+    Returns a dictionary mapping each reachable goal to (cost, actions);
+    goals that cannot be reached are left out.  If the optional SearchBudget
+    runs out, returns the goals reached so far and sets the stopReason of
+    problem.searchStats.
+    """
+    stats = SearchStats(problem, 'multiGoalSearch')
+    if budget != None: budget.start()
+    getSuccessors = stats.timeSuccessors(problem.getSuccessors)
+    remaining, found = set(goals), {}
+    closed = set()
+    pool = NodePool()
+    intern = pool.interner.intern
+    frontier = util.PriorityQueueWithFunction(lambda node: pool.costs[node])
+    frontier.push(pool.add(problem.getStartState()))
+    while remaining and not frontier.isEmpty():
+        stats.noteFrontier(len(frontier))
+        node = frontier.pop()
+        stateId = pool.stateIds[node]
+        if stateId in closed:
+            stats.duplicates += 1
+            continue
+        state = pool.interner.states[stateId]
+        if state in remaining:
+            found[state] = (pool.costs[node], pool.getPath(node))
+            remaining.remove(state)
+            if not remaining: break
+        if budget != None:
+            stats.stopReason = budget.exceeded(stats.expanded)
+            if stats.stopReason != None: break
+        closed.add(stateId)
+        stats.noteClosed(len(closed))
+        for successor, action, stepCost in getSuccessors(state):
+            successorId = intern(successor)
+            if successorId not in closed:
+                frontier.push(pool.addId(successorId, node, action, pool.costs[node] + stepCost))
+            else:
+                stats.duplicates += 1
+    stats.distinctStates = len(pool.interner)
+    stats.finish(None)
+    return found
+
+def bidirectionalSearch(problem, heuristic=nullHeuristic, backwardHeuristic=nullHeuristic, budget=None):
+    """
+    Searches forward from the start and backward from the goal at the same
+    time and splices the two halves together where they meet.
+
+    The problem must provide getGoalState and getPredecessors (see
+    SearchProblem).  heuristic(state, problem) estimates the cost from state
+    to the goal, as in aStarSearch; backwardHeuristic(state, problem)
+    estimates the cost from the start to state.  With the default null
+    heuristics this is a bidirectional uniform cost search, which is a
+    bidirectional breadth-first search on unit-cost problems.  Both
+    heuristics must be consistent for the returned path to be optimal.
+
+    Each step expands the direction with the smaller frontier.  The search
+    stops once no path through the unexpanded nodes can be cheaper than the
+    best meeting point found, using the bound
+    max(fminForward, fminBackward, gminForward + gminBackward).  budget is an
+    optional SearchBudget.
+    """
+    stats = SearchStats(problem, 'bidirectionalSearch')
+    if budget != None: budget.start()
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal: return stats.finish([])
+    heuristic, backwardHeuristic = stats.timeHeuristic(heuristic), stats.timeHeuristic(backwardHeuristic)
+    forward = _BidirectionalFrontier(start, lambda state: heuristic(state, problem),
+                                     stats.timeSuccessors(problem.getSuccessors), stats)
+    backward = _BidirectionalFrontier(goal, lambda state: backwardHeuristic(state, problem),
+                                      stats.timeSuccessors(problem.getPredecessors), stats)
+    best, meeting = float('inf'), None
+    while not forward.isEmpty() and not backward.isEmpty():
+        stats.noteFrontier(forward.size() + backward.size())
+        stats.noteClosed(len(forward.closed) + len(backward.closed))
+        lowerBound = max(forward.minF(), backward.minF(), forward.minG() + backward.minG())
+        if best <= lowerBound: break
+        if budget != None:
+            reason = budget.exceeded(stats.expanded)
+            if reason != None:
+                frontierSize = forward.size() + backward.size()
+                if meeting is not None:
+                    return _stopEarly(stats, reason, _splice(forward, backward, meeting), goal, best, frontierSize)
+                state = min(forward.closed | set([start]), key=lambda state: (forward.heuristic(state), -forward.g[state]))
+                return _stopEarly(stats, reason, _splice(forward, None, state), state, forward.g[state], frontierSize)
+        if forward.size() <= backward.size():
+            expanding, other = forward, backward
+        else:
+            expanding, other = backward, forward
+        for state, cost in expanding.expand():
+            if state in other.g and cost + other.g[state] < best:
+                best, meeting = cost + other.g[state], state
+    if meeting is None: return stats.finish(None)
+    return stats.finish(_splice(forward, backward, meeting))
+
+def _splice(forward, backward, meeting):
+    "The actions from the start to meeting and, unless backward is None, on from meeting to the goal"
+    actions = []
+    state = meeting
+    while state in forward.parent:
+        state, action = forward.parent[state]
+        actions.append(action)
+    actions.reverse()
+    state = meeting
+    while backward != None and state in backward.parent:
+        state, action = backward.parent[state]
+        actions.append(action)
+    return actions
+
+class _BidirectionalFrontier:
+    """
+    One direction of bidirectionalSearch: the cost g and parent link of every
+    state reached so far, plus two lazily-pruned heaps of the open states,
+    one ordered by f = g + h and one by g.  For the backward direction,
+    parent[state] is the state that 'action' leads to.  Dropped successors
+    are counted in stats.duplicates.
+    """
+    def __init__(self, root, heuristic, expandFunction, stats):
+        self.heuristic = heuristic
+        self.expandFunction = expandFunction
+        self.stats = stats
+        self.g = {root: 0}
+        self.parent = {}
+        self.closed = set()
+        self.counter = itertools.count()
+        self.fHeap, self.gHeap = [], []
+        self._push(root, 0)
+
+    def _push(self, state, cost):
+        tie = self.counter.next()
+        heapq.heappush(self.fHeap, (cost + self.heuristic(state), tie, cost, state))
+        heapq.heappush(self.gHeap, (cost, tie, cost, state))
+
+    def _prune(self, heap):
+        "Drops entries for closed states and entries superseded by a cheaper path"
+        while heap and (heap[0][-1] in self.closed or heap[0][-2] > self.g[heap[0][-1]]):
+            heapq.heappop(heap)
+
+    def isEmpty(self):
+        self._prune(self.fHeap)
+        return len(self.fHeap) == 0
+
+    def size(self):
+        return len(self.fHeap)
+
+    def minF(self):
+        self._prune(self.fHeap)
+        return self.fHeap[0][0]
+
+    def minG(self):
+        self._prune(self.gHeap)
+        return self.gHeap[0][0]
+
+    def expand(self):
+        """
+        Closes the open state with the lowest f and returns the (state, cost)
+        pairs whose cost it improved
+        """
+        self._prune(self.fHeap)
+        f, tie, cost, state = heapq.heappop(self.fHeap)
+        self.closed.add(state)
+        improved = []
+        for nextState, action, stepCost in self.expandFunction(state):
+            nextCost = cost + stepCost
+            if nextState in self.closed or nextCost >= self.g.get(nextState, float('inf')):
+                self.stats.duplicates += 1
+                continue
+            self.g[nextState] = nextCost
+            self.parent[nextState] = (state, action)
+            self._push(nextState, nextCost)
+            improved.append((nextState, nextCost))
+        return improved
+
+def iterativeDeepeningSearch(problem, cycleCheck=True, transpositionSize=0, budget=None):
+    """
+    Runs depth-limited depth first searches with limits 0, 1, 2, ... until
+    one of them reaches a goal, and returns the shallowest solution.  Only
+    the current path is kept in memory.  See idaStarSearch for cycleCheck,
+    transpositionSize and budget.
+    """
+    stats = SearchStats(problem, 'iterativeDeepeningSearch')
+    return _iterativeDeepening(problem, lambda state: 0, True, cycleCheck, transpositionSize, stats, budget)
+
+def idaStarSearch(problem, heuristic=nullHeuristic, cycleCheck=True, transpositionSize=0, budget=None):
+    """
+    Iterative deepening A*: depth first searches that prune nodes whose
+    f = g + h exceeds a bound, which starts at h(start) and is then raised to
+    the smallest f that was pruned.  With an admissible heuristic the first
+    solution found is optimal.  Memory is linear in the solution depth.
+    Nodes are expanded with problem.getSuccessorsAfter, so a problem can
+    skip moves that only undo the previous one.
+
+      cycleCheck:        skip successors that already lie on the current path
+      transpositionSize: if positive, remember the cheapest cost at which up
+                         to this many states were reached in the current
+                         iteration and skip later visits that are no cheaper
+      budget:            an optional SearchBudget
+    """
+    stats = SearchStats(problem, 'idaStarSearch')
+    heuristic = stats.timeHeuristic(heuristic)
+    return _iterativeDeepening(problem, lambda state: heuristic(state, problem), False, cycleCheck, transpositionSize,
+                               stats, budget)
+
+def _iterativeDeepening(problem, heuristic, countDepth, cycleCheck, transpositionSize, stats, budget):
+    "Raises the bound until _boundedDepthFirstSearch finds a goal; g is the depth if countDepth"
+    if budget != None: budget.start()
+    start = problem.getStartState()
+    bound = heuristic(start)
+    best = [(bound, 0), [], start, 0]
+    while bound != float('inf'):
+        actions, bound = _boundedDepthFirstSearch(problem, start, heuristic, bound, countDepth, cycleCheck,
+                                                  transpositionSize, stats, budget, best)
+        if isinstance(actions, PartialSearchResult): return actions
+        if actions != None: return stats.finish(actions)
+    return stats.finish(None)
+
+def _boundedDepthFirstSearch(problem, start, heuristic, bound, countDepth, cycleCheck, transpositionSize, stats,
+                             budget, best):
+    """
+    One iteration of _iterativeDeepening, run on an explicit stack so that
+    deep solutions do not hit Python's recursion limit.  Returns
+    (actions, None) if a goal is found within the bound and otherwise
+    (None, smallest f that exceeded the bound).  The frontier is the current
+    path and the closed set is the transposition table.
+
+    best holds the (h, -cost) key, actions, state and cost of the most
+    promising node expanded so far, for a PartialSearchResult if the budget
+    runs out.
+    """
+    if problem.isGoalState(start): return [], None
+    if hasattr(problem, 'getSuccessorsAfter'):
+        getSuccessors = stats.timeSuccessors(problem.getSuccessorsAfter)
+    else:
+        getSuccessors = stats.timeSuccessors(lambda state, action: problem.getSuccessors(state))
+    nextBound = float('inf')
+    table = {}
+    states, actions, costs = [start], [], [0]
+    successors = [iter(getSuccessors(start, None))]
+    onPath = set([start])
+    while successors:
+        try:
+            nextState, action, stepCost = successors[-1].next()
+        except StopIteration:
+            successors.pop()
+            costs.pop()
+            onPath.discard(states.pop())
+            if actions: actions.pop()
+            continue
+        if cycleCheck and nextState in onPath:
+            stats.duplicates += 1
+            continue
+        cost = costs[-1] + stepCost
+        if countDepth: g = len(actions) + 1
+        else: g = cost
+        estimate = heuristic(nextState)
+        if g + estimate > bound:
+            nextBound = min(nextBound, g + estimate)
+            continue
+        if transpositionSize > 0:
+            if table.get(nextState, float('inf')) <= g:
+                stats.duplicates += 1
+                continue
+            if len(table) < transpositionSize or nextState in table: table[nextState] = g
+            stats.noteClosed(len(table))
+        if problem.isGoalState(nextState):
+            return actions + [action], None
+        if budget != None:
+            reason = budget.exceeded(stats.expanded)
+            if reason != None:
+                key, bestActions, bestState, bestCost = best
+                return _stopEarly(stats, reason, bestActions, bestState, bestCost, len(states)), None
+        if (estimate, -cost) < best[0]: best[:] = [(estimate, -cost), actions + [action], nextState, cost]
+        states.append(nextState)
+        actions.append(action)
+        costs.append(cost)
+        successors.append(iter(getSuccessors(nextState, action)))
+        stats.noteFrontier(len(states))
+        if cycleCheck: onPath.add(nextState)
+    return None, nextBound
+
+def jumpPointSearch(problem, heuristic=nullHeuristic, budget=None):
+    """
+    Jump point search: A* over a 4-connected grid of unit-cost moves that
+    jumps along straight runs of open cells and only stops at the goal and at
+    jump points, where an optimal path may have to turn.  The returned
+    actions still take one grid step each.
+
+    The problem must report isUniformCostGrid() (a plain PositionSearchProblem
+    with the default costFn) and provide walls and getGoalState; for any
+    other problem this is just aStarSearch(problem, heuristic).  Jump point
+    search always uses the Manhattan distance to the goal as its heuristic.
+    budget is an optional SearchBudget.
+    """
+    if not ('isUniformCostGrid' in dir(problem) and problem.isUniformCostGrid()):
+        return aStarSearch(problem, heuristic, budget)
+    stats = SearchStats(problem, 'jumpPointSearch')
+    if budget != None: budget.start()
+    walls = problem.walls
+    goal = problem.getGoalState()
+    # Open cells as a flat bytearray with a closed border, so each test is one index
+    rowLength = walls.height + 2
+    openCells = bytearray((walls.width + 2) * rowLength)
+    for x, y in walls.asList(False):
+        openCells[(x + 1) * rowLength + y + 1] = 1
+    isOpen = lambda x, y: openCells[(x + 1) * rowLength + y + 1]
+
+    def jumpHorizontally(x, y, dx):
+        while True:
+            x += dx
+            if not isOpen(x, y): return None
+            if (x, y) == goal: return (x, y)
+            if (isOpen(x, y + 1) and not isOpen(x - dx, y + 1)) or (isOpen(x, y - 1) and not isOpen(x - dx, y - 1)):
+                return (x, y)
+
+    def jumpVertically(x, y, dy):
+        while True:
+            y += dy
+            if not isOpen(x, y): return None
+            if (x, y) == goal: return (x, y)
+            if (isOpen(x + 1, y) and not isOpen(x + 1, y - dy)) or (isOpen(x - 1, y) and not isOpen(x - 1, y - dy)):
+                return (x, y)
+            if jumpHorizontally(x, y, 1) or jumpHorizontally(x, y, -1):
+                return (x, y)
+
+    def jumps(point, parent):
+        "Directions worth trying from point, given the direction it was reached in"
+        x, y = point
+        if parent == None: return [(0, 1), (0, -1), (1, 0), (-1, 0)]
+        dx, dy = cmp(x, parent[0]), cmp(y, parent[1])
+        if dx != 0: return [(0, 1), (0, -1), (dx, 0)]
+        return [(1, 0), (-1, 0), (0, dy)]
+
+    start = problem.getStartState()
+    distance = lambda a, b: abs(a[0] - b[0]) + abs(a[1] - b[1])
+    g, parent, closed = {start: 0}, {start: None}, set()
+    counter = itertools.count()
+    heap = [(distance(start, goal), counter.next(), start)]
+    best = start
+    while heap:
+        stats.noteFrontier(len(heap))
+        f, tie, point = heapq.heappop(heap)
+        if point in closed:
+            stats.duplicates += 1
+            continue
+        if problem.isGoalState(point): return stats.finish(_jumpPath(point, parent))
+        if budget != None:
+            reason = budget.exceeded(stats.expanded)
+            if reason != None: return _stopEarly(stats, reason, _jumpPath(best, parent), best, g[best], len(heap) + 1)
+        if (distance(point, goal), -g[point]) < (distance(best, goal), -g[best]): best = point
+        closed.add(point)
+        stats.noteClosed(len(closed))
+        problem._expanded += 1
+        stats.expanded += 1
+        started = time.time()
+        x, y = point
+        for dx, dy in jumps(point, parent[point]):
+            if not isOpen(x + dx, y + dy): continue
+            if dx != 0: jumpPoint = jumpHorizontally(x, y, dx)
+            else: jumpPoint = jumpVertically(x, y, dy)
+            if jumpPoint == None: continue
+            stats.generated += 1
+            cost = g[point] + distance(point, jumpPoint)
+            if jumpPoint in closed or cost >= g.get(jumpPoint, float('inf')):
+                stats.duplicates += 1
+                continue
+            g[jumpPoint], parent[jumpPoint] = cost, point
+            heapq.heappush(heap, (cost + distance(jumpPoint, goal), counter.next(), jumpPoint))
+        stats.successorTime += time.time() - started
+    return stats.finish(None)
+
+def _jumpPath(point, parent):
+    "Expands the straight segments between jump points into single-step actions"
+    from game import Actions
+    actions = []
+    while parent[point] != None:
+        previous = parent[point]
+        dx, dy = cmp(point[0], previous[0]), cmp(point[1], previous[1])
+        steps = abs(point[0] - previous[0]) + abs(point[1] - previous[1])
+        actions.extend([Actions.vectorToDirection((dx, dy))] * steps)
+        point = previous
+    actions.reverse()
+    return actions
+
+def anytimeAStarSearch(problem, heuristic=nullHeuristic, timeLimit=1.0, initialWeight=3.0, weightStep=0.5, budget=None):
+    """
+    Anytime repairing A* (ARA*) with a wall-clock budget: returns the best
+    path found by anytimeAStarSolutions within timeLimit seconds, or sooner
+    if that path is proven optimal.  timeLimit is a hard deadline: if no path
+    has been found by then (or before the optional SearchBudget runs out),
+    the result is a PartialSearchResult.
+    """
+    best = None
+    for actions, cost, bound in anytimeAStarSolutions(problem, heuristic, time.time() + timeLimit, initialWeight,
+                                                      weightStep, budget):
+        best = actions
+    return best
+
+def anytimeAStarSolutions(problem, heuristic=nullHeuristic, deadline=None, initialWeight=3.0, weightStep=0.5, budget=None):
+    """
+    Anytime repairing A* (ARA*).  Yields (actions, cost, bound) each time a
+    cheaper path is found, where bound is a proven limit on cost / optimal
+    cost.  The first search orders nodes by g + initialWeight * h, so a first
+    path comes quickly; every later search lowers the weight by weightStep
+    and reuses the earlier work instead of starting over.
+
+    Stops when the bound reaches 1 (the last path is optimal), when nothing
+    is left to search, or once time.time() passes deadline.  The heuristic
+    must be admissible for the bounds to hold.
+
+    The optional SearchBudget also stops the search at once.  If the
+    deadline passes or the budget runs out before the first solution, the
+    last thing yielded is a PartialSearchResult, with an infinite bound.
+    """
+    stats = SearchStats(problem, 'anytimeAStarSearch')
+    if budget != None: budget.start()
+    getSuccessors = stats.timeSuccessors(problem.getSuccessors)
+    heuristic = stats.timeHeuristic(heuristic)
+    start = problem.getStartState()
+    hCache = {}
+    def h(state):
+        if state not in hCache: hCache[state] = heuristic(state, problem)
+        return hCache[state]
+
+    g, parent = {start: 0}, {start: None}
+    weight = initialWeight
+    counter = itertools.count()
+    openStates, inconsistent = set([start]), set()
+    best, bestCost = None, float('inf')
+    closest = start
+    while True:
+        improved = False
+        # Rebuild the open list for the current weight; states improved after being closed rejoin it
+        openStates |= inconsistent
+        heap = [(g[state] + weight * h(state), counter.next(), g[state], state) for state in openStates]
+        heapq.heapify(heap)
+        closed, inconsistent = set(), set()
+        while heap and heap[0][0] < bestCost:
+            stats.noteFrontier(len(heap))
+            f, tie, cost, state = heapq.heappop(heap)
+            if state in closed or cost != g[state]:
+                stats.duplicates += 1
+                continue
+            openStates.discard(state)
+            if problem.isGoalState(state):
+                # Links on this path may since have improved, so take the cost of the path itself
+                actions, pathCost = _parentPath(state, parent)
+                if pathCost < bestCost: best, bestCost, improved = actions, pathCost, True
+                break
+            reason = None
+            if deadline != None and time.time() > deadline:
+                # Running out of time after a solution is how an anytime search normally ends
+                if best != None:
+                    stats.finish(best)
+                    return
+                reason = 'time'
+            elif budget != None:
+                reason = budget.exceeded(stats.expanded)
+            if reason != None:
+                if best != None:
+                    stats.finish(best)
+                    stats.stopReason = reason
+                else:
+                    actions, pathCost = _parentPath(closest, parent)
+                    yield _stopEarly(stats, reason, actions, closest, pathCost, len(heap) + 1), pathCost, float('inf')
+                return
+            if (h(state), -cost) < (h(closest), -g[closest]): closest = state
+            closed.add(state)
+            stats.noteClosed(len(closed))
+            for nextState, action, stepCost in getSuccessors(state):
+                nextCost = cost + stepCost
+                if nextCost >= g.get(nextState, float('inf')):
+                    stats.duplicates += 1
+                    continue
+                g[nextState], parent[nextState] = nextCost, (state, action, stepCost)
+                if nextState in closed:
+                    inconsistent.add(nextState)
+                else:
+                    openStates.add(nextState)
+                    heapq.heappush(heap, (nextCost + weight * h(nextState), counter.next(), nextCost, nextState))
+        openStates = set([entry[3] for entry in heap if entry[3] not in closed and entry[2] == g[entry[3]]])
+        if best == None:
+            stats.finish(None)
+            return
+
+        # cost / optimal <= cost / (lowest g + h of any state that could still lead somewhere cheaper)
+        pending = [g[state] + h(state) for state in openStates | inconsistent]
+        if pending and min(pending) > 0: bound = min(weight, bestCost / float(min(pending)))
+        elif pending: bound = weight
+        else: bound = 1.0
+        bound = max(bound, 1.0)
+        if improved or bound <= 1.0:
+            stats.finish(best)
+            yield best, bestCost, bound
+        if bound <= 1.0 or weight <= 1.0:
+            stats.finish(best)
+            return
+        weight = max(1.0, weight - weightStep)
+
+def _parentPath(state, parent):
+    "Follows (previousState, action, stepCost) links back from state; returns the actions in order and their cost"
+    actions, cost = [], 0
+    while parent[state] != None:
+        state, action, stepCost = parent[state]
+        actions.append(action)
+        cost += stepCost
+    actions.reverse()
+    return actions, cost
+
+def parallelAStarSearch(problem, heuristic=nullHeuristic, workers=0, expansionsPerRound=500, budget=None):
+    """
+    Hash-distributed A* (HDA*) on workers processes (every CPU if workers is
+    0).  State s belongs to worker hash(s) % workers, which keeps the open and
+    closed entries for s; successors are sent to their owners in one batch per
+    worker per round.
+
+    In each round every worker merges the batches sent to it in the last
+    round, expands up to expansionsPerRound of its cheapest nodes and sends
+    out what they generated.  Nodes are not expanded in global f order, so a
+    state may later be reached more cheaply and is then expanded again.  The
+    search stops after a round in which nothing was sent and no worker holds a
+    node with g + h below the cheapest goal found, so the path is optimal
+    whenever the heuristic is admissible.
+
+    Workers are forked, so the problem and heuristic are inherited rather
+    than pickled; only states travel between processes, and they must hash
+    the same way in every worker (tuples, Grids and so on).  With one worker
+    this is plain aStarSearch.
+
+    The optional SearchBudget is checked between rounds.  If it runs out,
+    the result is the path to the cheapest goal found so far, or no actions
+    if there is none.
+    """
+    import multiprocessing
+    if workers < 1: workers = multiprocessing.cpu_count()
+    if workers == 1: return aStarSearch(problem, heuristic, budget)
+    stats = SearchStats(problem, 'parallelAStarSearch')
+    if budget != None: budget.start()
+
+    inboxes = [multiprocessing.Queue() for i in range(workers)]
+    pipes, processes = [], []
+    for index in range(workers):
+        pipe, workerPipe = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_parallelAStarWorker,
+                                          args=(index, problem, heuristic, inboxes, workerPipe, expansionsPerRound))
+        process.daemon = True
+        process.start()
+        pipes.append(pipe)
+        processes.append(process)
+
+    workerStats = [None] * workers
+    def pathTo(state):
+        "Each owner knows the link that reached its states last"
+        actions = []
+        while True:
+            pipe = pipes[hash(state) % workers]
+            pipe.send(('parent', state))
+            link = _parallelAStarReply(pipe)
+            if link is None: break
+            state, action = link
+            actions.append(action)
+        actions.reverse()
+        return actions
+
+    try:
+        start = problem.getStartState()
+        incumbent, goal, roundNumber = float('inf'), None, 0
+        while True:
+            for index in range(workers):
+                seed = []
+                if roundNumber == 0 and index == hash(start) % workers: seed = [(start, 0, None, None)]
+                pipes[index].send(('round', roundNumber, incumbent, seed))
+            roundNumber += 1
+            sent, lowestF, frontierSize = 0, float('inf'), 0
+            for index in range(workers):
+                reply = _parallelAStarReply(pipes[index])
+                workerSent, workerLowestF, workerGoal, workerCost, workerFrontier, workerStats[index] = reply
+                sent += workerSent
+                lowestF = min(lowestF, workerLowestF)
+                frontierSize += workerFrontier
+                if workerGoal is not None and workerCost < incumbent: incumbent, goal = workerCost, workerGoal
+            if sent == 0 and lowestF >= incumbent: break
+            if budget != None:
+                reason = budget.exceeded(sum([worker.expanded for worker in workerStats]))
+                if reason != None:
+                    if goal is None: return _stopEarly(stats, reason, [], start, 0, frontierSize + sent)
+                    return _stopEarly(stats, reason, pathTo(goal), goal, incumbent, frontierSize + sent)
+        if goal is None: return stats.finish(None)
+        return stats.finish(pathTo(goal))
+    finally:
+        for pipe in pipes:
+            try: pipe.send(('stop',))
+            except (IOError, EOFError): pass
+        for process in processes:
+            process.join(1)
+            if process.is_alive(): process.terminate()
+        for worker in workerStats:
+            if worker != None: stats.add(worker)
+        if hasattr(problem, '_expanded'): problem._expanded += stats.expanded
+
+def _parallelAStarReply(pipe):
+    "Receives a worker's answer, re-raising anything that went wrong in the worker"
+    reply = pipe.recv()
+    if reply[0] == 'error': raise Exception('parallelAStarSearch worker failed:\n' + reply[1])
+    return reply[1]
+
+def _parallelAStarWorker(index, problem, heuristic, inboxes, pipe, expansionsPerRound):
+    "Runs worker index of parallelAStarSearch until told to stop"
+    try:
+        workers = len(inboxes)
+        stats = SearchStats(problem, 'parallelAStarSearch')
+        getSuccessors = stats.timeSuccessors(problem.getSuccessors)
+        heuristic = stats.timeHeuristic(heuristic)
+        g, parent, heap, counter = {}, {}, [], itertools.count()
+        early = []
+        def relax(state, cost, previous, action):
+            if cost >= g.get(state, float('inf')):
+                stats.duplicates += 1
+                return
+            g[state] = cost
+            if previous is None: parent[state] = None
+            else: parent[state] = (previous, action)
+            heapq.heappush(heap, (cost + heuristic(state, problem), counter.next(), cost, state))
+
+        while True:
+            message = pipe.recv()
+            if message[0] == 'stop': return
+            if message[0] == 'parent':
+                pipe.send(('parent', parent[message[1]]))
+                continue
+            command, roundNumber, incumbent, seed = message
+            for entry in seed: relax(*entry)
+            # Every worker sends every other worker exactly one batch per round.  A
+            # fast worker's batch for this round can arrive before a slow worker's
+            # batch for the last one, so keep it for the next round.
+            if roundNumber > 0:
+                batches, early = early, []
+                while len(batches) < workers - 1:
+                    batchRound, batch = inboxes[index].get()
+                    if batchRound == roundNumber - 1: batches.append(batch)
+                    else: early.append(batch)
+                for batch in batches:
+                    for entry in batch: relax(*entry)
+
+            outboxes = [[] for i in range(workers)]
+            goal, expanded = None, 0
+            while heap and heap[0][0] < incumbent and expanded < expansionsPerRound:
+                stats.noteFrontier(len(heap))
+                f, tie, cost, state = heapq.heappop(heap)
+                if cost != g[state]:
+                    stats.duplicates += 1
+                    continue
+                if problem.isGoalState(state):
+                    goal, incumbent = state, cost
+                    continue
+                expanded += 1
+                for nextState, action, stepCost in getSuccessors(state):
+                    owner = hash(nextState) % workers
+                    if owner == index: relax(nextState, cost + stepCost, state, action)
+                    else: outboxes[owner].append((nextState, cost + stepCost, state, action))
+
+            while heap and heap[0][2] != g[heap[0][3]]: heapq.heappop(heap)
+            sent = 0
+            for i in range(workers):
+                if i == index: continue
+                inboxes[i].put((roundNumber, outboxes[i]))
+                sent += len(outboxes[i])
+            if heap: lowestF = heap[0][0]
+            else: lowestF = float('inf')
+            stats.noteClosed(len(g))
+            pipe.send(('round', (sent, lowestF, goal, incumbent, len(heap), stats)))
+    except Exception:
+        import traceback
+        pipe.send(('error', traceback.format_exc()))
+
+UNREACHED_DEPTH = 0xFF
+
+def layeredBreadthFirstSearch(problem, rank, size, backward=False, workers=0, budget=None):
+    """
+    Labels every state of a finite state space that is reachable from the
+    start state with its depth, the fewest steps needed to reach it.  If
+    backward is true the search starts from problem.getGoalState() and
+    follows getPredecessors instead, so every label is the number of steps
+    to the goal.
+
+    rank maps each state to a distinct integer in range(size).  The result
+    is a bytearray of size labels indexed by rank, with UNREACHED_DEPTH for
+    states that were never reached; deeper states raise a ValueError.
+
+    The search is level-synchronous: each level is split evenly among
+    workers processes (every CPU if workers is 0), which expand their part
+    and drop the successors that already carry a label.  The labels are kept
+    in shared memory and written only by the parent, which labels the new
+    states and gathers them into the next level.  As in parallelAStarSearch
+    the workers are forked, so only states travel between processes.
+
+    The optional SearchBudget is checked before each level.  If it runs out,
+    the result is an empty PartialSearchResult whose labels attribute holds
+    the labels so far: every state up to the depth of the unfinished level
+    has its final label and deeper states have none yet.
+    """
+    import multiprocessing
+    if workers < 1: workers = multiprocessing.cpu_count()
+    stats = SearchStats(problem, 'layeredBreadthFirstSearch')
+    if budget != None: budget.start()
+    if backward: start, expand = problem.getGoalState(), problem.getPredecessors
+    else: start, expand = problem.getStartState(), problem.getSuccessors
+    if workers == 1:
+        labels = bytearray([UNREACHED_DEPTH]) * size
+    else:
+        import ctypes
+        labels = multiprocessing.RawArray('B', size)
+        ctypes.memset(labels, UNREACHED_DEPTH, size)
+    labels[rank(start)] = 0
+
+    pipes, processes = [], []
+    if workers > 1:
+        for index in range(workers):
+            pipe, workerPipe = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_layeredBreadthFirstWorker, args=(expand, rank, labels, workerPipe))
+            process.daemon = True
+            process.start()
+            pipes.append(pipe)
+            processes.append(process)
+
+    try:
+        level, depth, labelled = [start], 0, 1
+        while level:
+            stats.noteFrontier(len(level))
+            if budget != None:
+                reason = budget.exceeded(stats.expanded)
+                if reason != None:
+                    result = _stopEarly(stats, reason, [], start, 0, len(level))
+                    result.labels = labels
+                    if pipes: result.labels = bytearray(buffer(labels))
+                    return result
+            depth += 1
+            if depth >= UNREACHED_DEPTH: raise ValueError('States lie deeper than the labels can record')
+            if pipes:
+                for index in range(workers):
+                    pipes[index].send(('level', level[index::workers]))
+                results = []
+                for pipe in pipes:
+                    reply = pipe.recv()
+                    if reply[0] == 'error': raise Exception('layeredBreadthFirstSearch worker failed:\n' + reply[1])
+                    results.append(reply[1])
+            else:
+                results = [_expandLevel(expand, rank, labels, level)]
+            level = []
+            for expanded, generated, successorTime, found in results:
+                stats.expanded += expanded
+                stats.generated += generated
+                stats.successorTime += successorTime
+                for index, state in found:
+                    if labels[index] != UNREACHED_DEPTH:
+                        stats.duplicates += 1
+                        continue
+                    labels[index] = depth
+                    level.append(state)
+            labelled += len(level)
+            stats.noteClosed(labelled)
+        stats.finish(None)
+        if pipes: return bytearray(buffer(labels))
+        return labels
+    finally:
+        for pipe in pipes:
+            try: pipe.send(('stop',))
+            except (IOError, EOFError): pass
+        for process in processes:
+            process.join(1)
+            if process.is_alive(): process.terminate()
+
+def _expandLevel(expand, rank, labels, states):
+    """
+    Expands part of a level of layeredBreadthFirstSearch.  Returns the counts
+    of states expanded and generated, the time spent generating them, and
+    (rank, state) pairs for the distinct successors without a label.
+    """
+    found, generated = {}, 0
+    started = time.time()
+    for state in states:
+        for nextState, action, stepCost in expand(state):
+            generated += 1
+            index = rank(nextState)
+            if labels[index] == UNREACHED_DEPTH and index not in found: found[index] = nextState
+    return len(states), generated, time.time() - started, found.items()
+
+def _layeredBreadthFirstWorker(expand, rank, labels, pipe):
+    "Expands the parts of levels sent by layeredBreadthFirstSearch until told to stop"
+    try:
+        while True:
+            message = pipe.recv()
+            if message[0] == 'stop': return
+            pipe.send(('level', _expandLevel(expand, rank, labels, message[1])))
+    except Exception:
+        import traceback
+        pipe.send(('error', traceback.format_exc()))
+
+class DStarLite:
+    """
+    D* Lite: incremental search for the cheapest path from a start state,
+    which may move, to the nearest of a set of goal states, which may change,
+    on a graph whose step costs may change.
+
+    The search runs backward from the goals and keeps, for every state it
+    has touched, g (its cost to the nearest goal as of the last search) and
+    rhs (the cost its successors' g values imply).  Between queries,
+    moveStart, addGoal, removeGoal and notifyChanged only mark the states
+    whose rhs may be out of date, and the next getPlan repairs just the part
+    of the search those states affect instead of starting over.
+
+    The problem must provide getSuccessors and getPredecessors (see
+    SearchProblem); isGoalState is not used.  heuristic(a, b) estimates the
+    cost between two states, such as util.manhattanDistance on positions,
+    and must be consistent for the plans to be optimal.  The SearchStats in
+    problem.searchStats add up over the life of the planner; a state counts
+    as expanded when it is taken off the queue and its g changes, not when
+    its rhs is recomputed.
+    """
+    def __init__(self, problem, goals, start=None, heuristic=None):
+        self.problem = problem
+        self.stats = SearchStats(problem, 'DStarLite')
+        self.getSuccessors = self.stats.timeSuccessors(problem.getSuccessors, False)
+        self.getPredecessors = self.stats.timeSuccessors(problem.getPredecessors, False)
+        if heuristic == None: heuristic = lambda a, b: 0
+        self.heuristic = self.stats.timeHeuristic(heuristic)
+        if start == None: start = problem.getStartState()
+        self.start = self.lastStart = start
+        self.keyModifier = 0
+        self.goals = set(goals)
+        self.g, self.rhs = {}, {}
+        self.queued, self.heap = {}, []
+        self.counter = itertools.count()
+        for goal in self.goals:
+            self.rhs[goal] = 0
+            self._queue(goal)
+
+    def moveStart(self, start):
+        "Makes start the state later plans begin from"
+        self.keyModifier += self.heuristic(self.lastStart, start)
+        self.start = self.lastStart = start
+
+    def addGoal(self, state):
+        self.goals.add(state)
+        self._update(state)
+
+    def removeGoal(self, state):
+        self.goals.discard(state)
+        self._update(state)
+
+    def notifyChanged(self, states):
+        """
+        Call after the cost of stepping into or out of any of states has
+        changed, including states that became blocked or open.
+        """
+        for state in states:
+            self._update(state)
+            for previous, action, stepCost in self.getPredecessors(state):
+                self._update(previous)
+
+    def getPlan(self, budget=None):
+        """
+        Returns the list of actions of a cheapest path from the start to the
+        nearest goal, or None if no goal can be reached.  If the optional
+        SearchBudget runs out first, returns an empty PartialSearchResult;
+        the next call picks the repair up where this one stopped.
+        """
+        reason = self._computeCosts(budget)
+        if reason != None: return _stopEarly(self.stats, reason, [], self.start, 0, len(self.queued))
+        self.stats.stopReason = None
+        if self.g.get(self.start, float('inf')) == float('inf'): return self.stats.finish(None)
+        actions, state, visited = [], self.start, set([self.start])
+        while state not in self.goals:
+            best, bestCost = None, float('inf')
+            for nextState, action, stepCost in self.problem.getSuccessors(state):
+                cost = stepCost + self.g.get(nextState, float('inf'))
+                if cost < bestCost: best, bestCost = (nextState, action), cost
+            if best == None or best[0] in visited: return self.stats.finish(None)
+            state = best[0]
+            visited.add(state)
+            actions.append(best[1])
+        return self.stats.finish(actions)
+
+    def getCost(self):
+        "The cost of the path getPlan returns (infinite if there is none)"
+        self._computeCosts()
+        return self.g.get(self.start, float('inf'))
+
+    def _key(self, state):
+        cost = min(self.g.get(state, float('inf')), self.rhs.get(state, float('inf')))
+        return (cost + self.heuristic(self.start, state) + self.keyModifier, cost)
+
+    def _queue(self, state):
+        key = self._key(state)
+        self.queued[state] = key
+        heapq.heappush(self.heap, (key, self.counter.next(), state))
+        self.stats.noteFrontier(len(self.queued))
+
+    def _update(self, state):
+        "Recomputes the rhs of state and queues it if its g is out of date"
+        if state in self.goals:
+            self.rhs[state] = 0
+        else:
+            rhs = float('inf')
+            for nextState, action, stepCost in self.getSuccessors(state):
+                rhs = min(rhs, stepCost + self.g.get(nextState, float('inf')))
+            self.rhs[state] = rhs
+        if state in self.queued: del self.queued[state]
+        if self.g.get(state, float('inf')) != self.rhs[state]: self._queue(state)
+
+    def _topKey(self):
+        "The lowest key in the queue, dropping entries that were requeued or removed"
+        while self.heap and self.queued.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+            self.stats.duplicates += 1
+        if self.heap: return self.heap[0][0]
+        return (float('inf'), float('inf'))
+
+    def _computeCosts(self, budget=None):
+        "Repairs g until the start's is right; returns why a budget stopped it early, or None"
+        inf = float('inf')
+        if budget != None: budget.start(self.stats.expanded)
+        while self._topKey() < self._key(self.start) or self.rhs.get(self.start, inf) != self.g.get(self.start, inf):
+            if not self.heap: break
+            if budget != None:
+                reason = budget.exceeded(self.stats.expanded)
+                if reason != None: return reason
+            key, tie, state = heapq.heappop(self.heap)
+            del self.queued[state]
+            if key < self._key(state):
+                self._queue(state)
+            elif self.g.get(state, inf) > self.rhs[state]:
+                self.g[state] = self.rhs[state]
+                for previous, action, stepCost in self._expand(state):
+                    self._update(previous)
+            else:
+                self.g[state] = inf
+                self._update(state)
+                for previous, action, stepCost in self._expand(state):
+                    self._update(previous)
+        self.stats.noteClosed(len(self.g))
+        return None
+
+    def _expand(self, state):
+        "Returns the predecessors of a state whose g just changed, counting it as an expansion"
+        predecessors = self.getPredecessors(state)
+        self.stats.expanded += 1
+        self.stats.generated += len(predecessors)
+        return predecessors
 
 
 # Abbreviations
@@ -114,3 +1641,9 @@ bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+bds = bidirectionalSearch
+ids = iterativeDeepeningSearch
+idastar = idaStarSearch
+jps = jumpPointSearch
+arastar = anytimeAStarSearch
+hdastar = parallelAStarSearch
@@ -31,9 +31,11 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import getMoveTable
 import util
 import time
 import search
+import layout
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -62,10 +64,13 @@ class SearchAgent(Agent):
       breadthFirstSearch or bfs
 
 
+    Use stats=True to also print the search's SearchStats as JSON.
+
     Note: You should NOT change any code in SearchAgent
     """
+    printStats = False
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', stats='False'):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -91,6 +96,7 @@ class SearchAgent(Agent):
             raise AttributeError, prob + ' is not a search problem type in SearchAgents.py.'
         self.searchType = globals()[prob]
         print('[SearchAgent] using problem type ' + prob)
+        self.printStats = str(stats).lower() in ['true', '1']
 
     def registerInitialState(self, state):
         """
@@ -107,6 +113,7 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if self.printStats and 'searchStats' in dir(problem): print('Search stats: ' + problem.searchStats.toJSON())
 
     def getAction(self, state):
         """
@@ -123,6 +130,10 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+def unitCost(pos):
+    "The default costFn of PositionSearchProblem: every step costs 1"
+    return 1
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test,
@@ -133,20 +144,31 @@ class PositionSearchProblem(search.SearchProblem):
 
     Note: this search problem is fully specified; you should NOT change it.
     """
+    priorityQueue = 'buckets' # Step costs are usually small integers (see search.SearchProblem)
 
-    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True):
+    def __init__(self, gameState, costFn = unitCost, goal=(1,1), start=None, warn=True, fixedCosts=None):
         """
         Stores the start and goal.
 
         gameState: A GameState object (pacman.py)
         costFn: A function from a search state (tuple) to a non-negative number
         goal: A position in the gameState
+        fixedCosts: True if costFn always gives the same cost for a position,
+          so that the costs can be looked up in a table built once per maze
+          and costFn (see getSuccessorTable).  By default only unitCost
+          counts as fixed.
         """
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
         self.costFn = costFn
+        self.moveTable = getMoveTable(self.walls)
+        self.successorTable = None
+        if costFn is unitCost:
+            self.successorTable = self.moveTable.unitSuccessors
+        elif fixedCosts:
+            self.successorTable = getSuccessorTable(self.walls, costFn)
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
@@ -181,15 +203,11 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        if self.successorTable != None:
+            successors = self.successorTable[state][:]
+        else:
+            costFn = self.costFn
+            successors = [(nextState, action, costFn(nextState)) for nextState, action in self.moveTable.moves[state]]
 
         # Bookkeeping for display purposes
         self._expanded += 1
@@ -199,6 +217,33 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def isUniformCostGrid(self):
+        """
+        True for a plain PositionSearchProblem that uses unitCost, so every
+        move costs 1 and search.jumpPointSearch applies.
+        """
+        return self.__class__ == PositionSearchProblem and self.costFn is unitCost
+
+    def getPredecessors(self, state):
+        """
+        Returns the (predecessor, action, stepCost) triples of the positions
+        that can step into state.  Moves are reversible, so the predecessors
+        are the open neighbors, and each step costs costFn(state).
+        """
+        cost = self.costFn(state)
+        predecessors = [(previous, action, cost) for previous, action in self.moveTable.predecessors[state]]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions.  If those actions
@@ -225,7 +270,7 @@ class StayEastSearchAgent(SearchAgent):
     def __init__(self):
         self.searchFunction = search.uniformCostSearch
         costFn = lambda pos: .5 ** pos[0]
-        self.searchType = lambda state: PositionSearchProblem(state, costFn)
+        self.searchType = lambda state: PositionSearchProblem(state, costFn, fixedCosts=True)
 
 class StayWestSearchAgent(SearchAgent):
     """
@@ -237,7 +282,26 @@ class StayWestSearchAgent(SearchAgent):
     def __init__(self):
         self.searchFunction = search.uniformCostSearch
         costFn = lambda pos: 2 ** pos[0]
-        self.searchType = lambda state: PositionSearchProblem(state, costFn)
+        self.searchType = lambda state: PositionSearchProblem(state, costFn, fixedCosts=True)
+
+SUCCESSOR_TABLE_CACHE = util.LRUCache(maxEntries=16)
+
+def getSuccessorTable(walls, costFn):
+    """
+    Returns, for every cell of a walls Grid, the list of (successor,
+    action, stepCost) triples that PositionSearchProblem.getSuccessors
+    gives for it, with the costs from costFn folded in.  Tables are kept
+    for the last few (walls, costFn) pairs, so costFn must give the same
+    cost for a position every time.  Neither may change afterwards.
+    """
+    key = (walls, costFn)
+    table = SUCCESSOR_TABLE_CACHE.get(key)
+    if table == None:
+        table = {}
+        for cell, moves in getMoveTable(walls).moves.items():
+            table[cell] = [(successor, action, costFn(successor)) for successor, action in moves]
+        SUCCESSOR_TABLE_CACHE.put(key, table)
+    return table
 
 def manhattanHeuristic(position, problem, info={}):
     "The Manhattan distance heuristic for a PositionSearchProblem"
@@ -361,6 +425,8 @@ class FoodSearchProblem:
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
       foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
     """
+    priorityQueue = 'buckets' # Every step costs 1 (see search.SearchProblem)
+
     def __init__(self, startingGameState):
         self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
         self.walls = startingGameState.getWalls()
@@ -402,12 +468,59 @@ class FoodSearchProblem:
             cost += 1
         return cost
 
+def foodStateKey(state):
+    """
+    A compact key for a FoodSearchProblem state, (position, food bits),
+    for caches such as search.memoizeHeuristic
+    """
+    position, foodGrid = state
+    return (position, foodGrid.bits)
+
 class AStarFoodSearchAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
     def __init__(self):
         self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
         self.searchType = FoodSearchProblem
 
+class AnytimeFoodSearchAgent(SearchAgent):
+    """
+    A SearchAgent for FoodSearchProblem using anytime A* and your
+    foodHeuristic.  Keeps improving its plan for timeLimit seconds, but never
+    for more than STARTUP_FRACTION of the game's maximum startup time (see
+    ClassicGameRules.getMaxStartupTime).  If no complete path is found in
+    that time, it follows the partial path the search returns and plans again
+    from where that path ends.  Each new plan gets at most STARTUP_FRACTION of
+    what is left of the game's total time for the agent
+    (ClassicGameRules.getMaxTotalTime); once that share drops below
+    MIN_PLANNING_TIME the agent stops planning.
+    """
+    STARTUP_FRACTION = 0.5
+    MIN_PLANNING_TIME = 0.05
+
+    def __init__(self, timeLimit='1.0'):
+        from pacman import ClassicGameRules
+        rules = ClassicGameRules()
+        self.timeLimit = min(float(timeLimit), AnytimeFoodSearchAgent.STARTUP_FRACTION * rules.getMaxStartupTime(0))
+        self.timeLeft = rules.getMaxTotalTime(0)
+        self.searchFunction = self.plan
+        self.searchType = FoodSearchProblem
+
+    def plan(self, problem):
+        "Runs anytime A* within the time limit and charges the time used against timeLeft"
+        maxTime = min(self.timeLimit, AnytimeFoodSearchAgent.STARTUP_FRACTION * self.timeLeft)
+        starttime = time.time()
+        actions = search.anytimeAStarSearch(problem, foodHeuristic, maxTime,
+                                            budget=search.SearchBudget(maxTime=maxTime))
+        self.timeLeft -= time.time() - starttime
+        return actions
+
+    def getAction(self, state):
+        if 'actionIndex' in dir(self) and self.actionIndex >= len(self.actions) and state.getNumFood() > 0 \
+                and AnytimeFoodSearchAgent.STARTUP_FRACTION * self.timeLeft >= AnytimeFoodSearchAgent.MIN_PLANNING_TIME:
+            self.actions = self.plan(self.searchType(state))
+            self.actionIndex = 0
+        return SearchAgent.getAction(self, state)
+
 def foodHeuristic(state, problem):
     """
     Your heuristic for the FoodSearchProblem goes here.
@@ -465,6 +578,47 @@ class ClosestDotSearchAgent(SearchAgent):
         "*** YOUR CODE HERE ***"
         util.raiseNotDefined()
 
+class IncrementalClosestDotAgent(Agent):
+    """
+    Heads for the closest dot, planning every move with one search.DStarLite
+    rooted at the remaining food.  Eaten dots are dropped from its goals
+    and, when ghostPenalty is positive, the cells at and next to each ghost
+    that is not scared cost that much extra to enter.  Only the part of the
+    search that those changes affect is searched again.
+    """
+    def __init__(self, ghostPenalty='20'):
+        self.ghostPenalty = float(ghostPenalty)
+
+    def registerInitialState(self, state):
+        self.walls = state.getWalls()
+        self.danger = set()
+        self.food = set(state.getFood().asList())
+        problem = PositionSearchProblem(state, costFn=self.stepCost, warn=False)
+        self.planner = search.DStarLite(problem, self.food, heuristic=util.manhattanDistance)
+
+    def stepCost(self, position):
+        if position in self.danger: return 1 + self.ghostPenalty
+        return 1
+
+    def getAction(self, state):
+        self.planner.moveStart(state.getPacmanPosition())
+        food = set(state.getFood().asList())
+        for eaten in self.food - food: self.planner.removeGoal(eaten)
+        self.food = food
+        if self.ghostPenalty > 0:
+            danger = set()
+            for ghost in state.getGhostStates():
+                if ghost.scaredTimer > 0: continue
+                x, y = util.nearestPoint(ghost.getPosition())
+                for dx, dy in [(0, 0), (0, 1), (0, -1), (1, 0), (-1, 0)]:
+                    if not self.walls[int(x + dx)][int(y + dy)]: danger.add((int(x + dx), int(y + dy)))
+            changed = danger ^ self.danger
+            self.danger = danger
+            self.planner.notifyChanged(changed)
+        plan = self.planner.getPlan()
+        if not plan: return Directions.STOP
+        return plan[0]
+
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
       A search problem for finding a path to any food.
@@ -488,7 +642,9 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
-        self.costFn = lambda x: 1
+        self.costFn = unitCost
+        self.moveTable = getMoveTable(self.walls)
+        self.successorTable = self.moveTable.unitSuccessors
         self._visited, self._visitedlist, self._expanded = {}, [], 0
 
     def isGoalState(self, state):
@@ -523,18 +679,58 @@ class ApproximateSearchAgent(Agent):
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built.  The gameState can be any game state -- Pacman's position
-    in that state is ignored.
+    Returns the maze distance between any two points.  The gameState can be
+    any game state -- Pacman's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
+    Distances come from the layout's precomputed all-pairs table (see
+    layout.MazeDistances), so after the first call for a maze each query is a
+    constant-time lookup.  Returns None if the points are not connected.
+
     This might be a useful helper function for your ApproximateSearchAgent.
     """
     x1, y1 = point1
     x2, y2 = point2
     walls = gameState.getWalls()
-    assert not walls[x1][y1], 'point1 is a wall: ' + point1
+    assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
-    return len(search.bfs(prob))
+    return layout.getMazeDistances(walls).getDistance(point1, point2)
+
+def distanceField(sources, gameState, parents=False):
+    """
+    Returns the maze distances from a position, or from the nearest of a list
+    of positions, to every cell of the maze of gameState, as a
+    layout.DistanceField.  One call costs about as much as a single search, so
+    an agent can afford a fresh field every turn:
+
+      field = distanceField(gameState.getPacmanPosition(), gameState, parents=True)
+      field.getDistance(ghostPosition)    # maze distance to Pacman
+      field.getDirection(ghostPosition)   # first move of a shortest path to Pacman
+    """
+    return layout.DistanceField(gameState.getWalls(), sources, parents)
+
+def mazePaths(pairs, gameState, costFn = unitCost):
+    """
+    Answers many shortest-path queries on the maze of gameState at once.
+    pairs is a list of (start, goal) positions; returns a dictionary mapping
+    each pair to (cost, actions), or to None if goal cannot be reached from
+    start.  costFn is as in PositionSearchProblem.
+
+    Pairs are grouped by start and each group is answered by one
+    search.multiGoalSearch, which stops as soon as all the goals of the group
+    are reached, so the paths from Pacman to every food dot take one search:
+
+      pacman = gameState.getPacmanPosition()
+      paths = mazePaths([(pacman, food) for food in gameState.getFood().asList()], gameState)
+    """
+    goalsByStart = {}
+    for start, goal in pairs:
+        goalsByStart.setdefault(start, set()).add(goal)
+    answers = {}
+    for start, goals in goalsByStart.items():
+        problem = PositionSearchProblem(gameState, costFn, start=start, warn=False)
+        found = search.multiGoalSearch(problem, goals)
+        for goal in goals:
+            answers[(start, goal)] = found.get(goal)
+    return answers
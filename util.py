@@ -6,7 +6,8 @@
 # John DeNero (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
-import sys
+import sys, os
+import mmap, struct
 import inspect
 import heapq, random
 
@@ -32,6 +33,9 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
@@ -52,6 +56,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -62,21 +69,39 @@ class PriorityQueue:
       Note that this PriorityQueue does not allow you to change the priority
       of an item.  However, you may insert the same item multiple times with
       different priorities.
+
+      Items of equal priority come out in the order they were pushed, so the
+      order never depends on comparing the items themselves.
     """
     def  __init__(self):
         self.heap = []
+        self.count = 0
 
     def push(self, item, priority):
-        pair = (priority,item)
-        heapq.heappush(self.heap,pair)
+        entry = (priority, self.count, item)
+        self.count += 1
+        heapq.heappush(self.heap, entry)
 
     def pop(self):
-        (priority,item) = heapq.heappop(self.heap)
+        (priority, count, item) = heapq.heappop(self.heap)
         return item
 
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
+    def getEntries(self):
+        "Returns the queue's contents as (priority, count, item) triples, in no particular order"
+        return list(self.heap)
+
+    def setEntries(self, entries, count):
+        "Replaces the queue's contents with triples from getEntries and the counter with count"
+        self.heap = list(entries)
+        heapq.heapify(self.heap)
+        self.count = count
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -93,6 +118,344 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class BucketQueue:
+    """
+      A priority queue for small non-negative integer priorities, such as
+      the path costs of problems whose every step costs 1 (Dial's
+      algorithm).  There is one first-in first-out bucket per priority and
+      a cursor that never lies above the lowest non-empty bucket.  When
+      priorities never fall below the last one popped, as in uniform cost
+      search or A* with a consistent heuristic, push and pop take O(1)
+      time; a lower priority just moves the cursor back.
+
+      Priorities that are not integers, or that are maxBucket or more, go to
+      a binary heap instead, so any priority works.  Items come out in
+      exactly the same order as from PriorityQueue: by priority, then in
+      the order they were pushed.
+    """
+    def __init__(self, maxBucket=65536):
+        import collections
+        self.newBucket = collections.deque
+        self.buckets = []
+        self.lowest = 0
+        self.heap = []
+        self.maxBucket = maxBucket
+        self.size = 0
+        self.count = 0
+
+    def push(self, item, priority):
+        if 0 <= priority < self.maxBucket and priority == int(priority):
+            index = int(priority)
+            while len(self.buckets) <= index:
+                self.buckets.append(self.newBucket())
+            self.buckets[index].append((self.count, item))
+            if index < self.lowest: self.lowest = index
+        else:
+            heapq.heappush(self.heap, (priority, self.count, item))
+        self.count += 1
+        self.size += 1
+
+    def pop(self):
+        if self.size == 0: raise IndexError('pop from an empty BucketQueue')
+        buckets = self.buckets
+        while self.lowest < len(buckets) and not buckets[self.lowest]:
+            self.lowest += 1
+        self.size -= 1
+        if self.heap and (self.lowest == len(buckets) or self.heap[0][:2] < (self.lowest, buckets[self.lowest][0][0])):
+            return heapq.heappop(self.heap)[2]
+        return buckets[self.lowest].popleft()[1]
+
+    def isEmpty(self):
+        return self.size == 0
+
+    def __len__(self):
+        return self.size
+
+    def getEntries(self):
+        "Returns the queue's contents as (priority, count, item) triples, in no particular order"
+        entries = list(self.heap)
+        for priority in range(self.lowest, len(self.buckets)):
+            entries.extend([(priority, count, item) for count, item in self.buckets[priority]])
+        return entries
+
+    def setEntries(self, entries, count):
+        "Replaces the queue's contents with triples from getEntries and the counter with count"
+        self.buckets, self.lowest, self.heap, self.size = [], 0, [], 0
+        for priority, entryCount, item in sorted(entries, key=lambda entry: entry[:2]):
+            self.count = entryCount
+            BucketQueue.push(self, item, priority)
+        self.count = count
+
+class BucketQueueWithFunction(BucketQueue):
+    """
+    A BucketQueue with the push(item) signature of PriorityQueueWithFunction,
+    for which it is a drop-in replacement.
+    """
+    def __init__(self, priorityFunction, maxBucket=65536):
+        "priorityFunction (item) -> priority"
+        self.priorityFunction = priorityFunction
+        BucketQueue.__init__(self, maxBucket)
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        BucketQueue.push(self, item, self.priorityFunction(item))
+
+class IndexedPriorityQueue:
+    """
+      A binary heap that keeps at most one entry per key and remembers where
+      each entry sits, so an entry's priority can be lowered in place
+      (decrease-key) instead of pushing a second copy of the item.
+
+      By default an item is its own key and must be hashable; keyFunction
+      can derive the key instead, for example the state of a search node.
+      Items of equal priority come out in the order they were pushed, or
+      last lowered.
+    """
+    def __init__(self, keyFunction=None):
+        self.heap = []
+        self.position = {}
+        self.keyFunction = keyFunction
+        self.count = 0
+
+    def _key(self, item):
+        if self.keyFunction == None: return item
+        return self.keyFunction(item)
+
+    def push(self, item, priority):
+        """
+        Adds item with priority.  If an item with the same key is queued with
+        a higher priority, item replaces it with the lower priority.  If the
+        queued priority is the same or lower, nothing changes.  Returns
+        whether the queue changed.
+        """
+        key = self._key(item)
+        if key in self.position:
+            i = self.position[key]
+            if self.heap[i][0] <= priority: return False
+            self.heap[i] = (priority, self.count, item)
+            self.count += 1
+            self._siftUp(i)
+            return True
+        self.heap.append((priority, self.count, item))
+        self.count += 1
+        self.position[key] = len(self.heap) - 1
+        self._siftUp(len(self.heap) - 1)
+        return True
+
+    update = push
+
+    def pop(self):
+        heap = self.heap
+        priority, count, item = heap[0]
+        del self.position[self._key(item)]
+        last = heap.pop()
+        if heap:
+            heap[0] = last
+            self.position[self._key(last[2])] = 0
+            self._siftDown(0)
+        return item
+
+    def getPriority(self, item):
+        "Returns the priority of the entry with item's key, or None if there is none"
+        key = self._key(item)
+        if key not in self.position: return None
+        return self.heap[self.position[key]][0]
+
+    def __contains__(self, item):
+        return self._key(item) in self.position
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def getEntries(self):
+        "Returns the queue's contents as (priority, count, item) triples, in no particular order"
+        return list(self.heap)
+
+    def setEntries(self, entries, count):
+        "Replaces the queue's contents with triples from getEntries and the counter with count"
+        self.heap = list(entries)
+        heapq.heapify(self.heap)
+        self.position = dict([(self._key(item), i) for i, (priority, entryCount, item) in enumerate(self.heap)])
+        self.count = count
+
+    def _siftUp(self, i):
+        heap, position = self.heap, self.position
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not entry[:2] < heap[parent][:2]: break
+            heap[i] = heap[parent]
+            position[self._key(heap[i][2])] = i
+            i = parent
+        heap[i] = entry
+        position[self._key(entry[2])] = i
+
+    def _siftDown(self, i):
+        heap, position = self.heap, self.position
+        entry, n = heap[i], len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n: break
+            if child + 1 < n and heap[child + 1][:2] < heap[child][:2]: child += 1
+            if not heap[child][:2] < entry[:2]: break
+            heap[i] = heap[child]
+            position[self._key(heap[i][2])] = i
+            i = child
+        heap[i] = entry
+        position[self._key(entry[2])] = i
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    An IndexedPriorityQueue with the push(item) signature of
+    PriorityQueueWithFunction, for which it is a drop-in replacement.
+    """
+    def __init__(self, priorityFunction, keyFunction=None):
+        "priorityFunction (item) -> priority"
+        self.priorityFunction = priorityFunction
+        IndexedPriorityQueue.__init__(self, keyFunction)
+
+    def push(self, item):
+        "Adds an item with priority from the priority function, or lowers the priority of its key"
+        return IndexedPriorityQueue.push(self, item, self.priorityFunction(item))
+
+class LRUCache:
+    """
+      A dictionary that holds at most maxEntries items, or items of at most
+      maxBytes bytes in all, and evicts the least recently used item to make
+      room.  A limit of None is not enforced.
+
+      The size of an item is estimated as the approximateSize of its key
+      plus the shallow size of its value.
+
+      get() counts hits and misses and put() counts evictions, so that you
+      can tell whether caching pays off.
+    """
+    def __init__(self, maxEntries=None, maxBytes=None):
+        import collections
+        self.items = collections.OrderedDict()
+        self.sizes = {}
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.bytes = 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def get(self, key, default=None):
+        "Returns the value for key, marking it most recently used, or default if it is not cached"
+        if key not in self.items:
+            self.misses += 1
+            return default
+        self.hits += 1
+        value = self.items.pop(key)
+        self.items[key] = value
+        return value
+
+    def put(self, key, value):
+        "Caches value for key as the most recently used item, evicting others as needed"
+        if key in self.items: self._remove(key)
+        size = 0
+        if self.maxBytes != None:
+            size = approximateSize(key) + sys.getsizeof(value)
+        self.items[key] = value
+        self.sizes[key] = size
+        self.bytes += size
+        while len(self.items) > 1 and ((self.maxEntries != None and len(self.items) > self.maxEntries) or
+                                       (self.maxBytes != None and self.bytes > self.maxBytes)):
+            self._remove(self.items.iterkeys().next())
+            self.evictions += 1
+
+    def _remove(self, key):
+        del self.items[key]
+        self.bytes -= self.sizes.pop(key)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def clear(self):
+        self.items.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+    def getStats(self):
+        "The counters and current size, as a dictionary"
+        lookups = self.hits + self.misses
+        hitRate = 0.0
+        if lookups > 0: hitRate = float(self.hits) / lookups
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'hitRate': hitRate,
+                'entries': len(self.items), 'bytes': self.bytes}
+
+class StateInterner:
+    """
+      Numbers distinct states 0, 1, 2, ... in the order they are first
+      interned, so that the rest of a search can work on dense ints: sets of
+      ids, dictionaries keyed by id and arrays indexed by id, instead of
+      containers of states that are expensive to hash and compare, such as
+      (position, Grid) pairs.  Each state is hashed once when it is interned,
+      and only the first copy of each distinct state is kept.
+
+      internAll and lookupAll handle many states in one call, and getStats
+      reports how many distinct states there are and roughly how much memory
+      they take.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.states = []
+
+    def intern(self, state):
+        "Returns the id of state, giving it the next free id if it is new"
+        stateId = self.ids.get(state)
+        if stateId == None:
+            stateId = self.ids[state] = len(self.states)
+            self.states.append(state)
+        return stateId
+
+    def internAll(self, states):
+        "Returns the list of ids of states, giving new ones the next free ids"
+        intern = self.intern
+        return [intern(state) for state in states]
+
+    def lookup(self, state, default=None):
+        "Returns the id of state, or default if it was never interned"
+        return self.ids.get(state, default)
+
+    def lookupAll(self, states, default=None):
+        "Returns the list of ids of states, with default for those never interned"
+        get = self.ids.get
+        return [get(state, default) for state in states]
+
+    def getState(self, stateId):
+        return self.states[stateId]
+
+    def getStates(self, stateIds):
+        states = self.states
+        return [states[stateId] for stateId in stateIds]
+
+    def __contains__(self, state):
+        return state in self.ids
+
+    def __len__(self):
+        return len(self.states)
+
+    def getStats(self):
+        """
+        The number of distinct states, the bytes taken by the id table and
+        the approximateSize of the states themselves, as a dictionary.  The
+        state sizes are summed on every call.
+        """
+        tableBytes = sys.getsizeof(self.ids) + sys.getsizeof(self.states)
+        stateBytes = sum([approximateSize(state) for state in self.states])
+        return {'states': len(self.states), 'tableBytes': tableBytes, 'stateBytes': stateBytes}
+
+def approximateSize(item):
+    "The shallow size of item in bytes, plus the shallow sizes of its items if it is a tuple"
+    size = sys.getsizeof(item)
+    if type(item) == tuple: size += sum([sys.getsizeof(part) for part in item])
+    return size
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
@@ -458,6 +821,67 @@ def lookup(name, namespace):
         if len(options) > 1: raise Exception, 'Name conflict for %s'
         raise Exception, '%s not found as a method or class' % name
 
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+def getCachePath(filename):
+    """
+    Returns the path of filename inside the on-disk cache directory, which
+    holds precomputed tables that are expensive to build but never change
+    (maze distances, for example).  The directory is created if needed.
+
+    Returns None if the directory cannot be created, for instance in a
+    read-only checkout; callers then build their tables in memory.
+    """
+    if not os.path.isdir(CACHE_DIRECTORY):
+        try: os.makedirs(CACHE_DIRECTORY)
+        except OSError:
+            if not os.path.isdir(CACHE_DIRECTORY): return None
+    return os.path.join(CACHE_DIRECTORY, filename)
+
+def saveCachedTable(filename, magic, length, data):
+    """
+    Writes the bytes of data (a string, bytearray or array) to filename in
+    the cache directory, after the magic string and length (a 32-bit
+    little-endian number, such as the number of entries) that
+    loadCachedTable checks.  The file is written under a temporary name and
+    renamed, so other processes never see half of it.  A table that cannot
+    be saved only costs a rebuild in the next run, so errors are ignored.
+    """
+    path = getCachePath(filename)
+    if path == None: return
+    tmpname = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        f = open(tmpname, 'wb')
+        try:
+            f.write(magic + struct.pack('<I', length))
+            f.write(data)
+        finally: f.close()
+        os.rename(tmpname, path)
+    except EnvironmentError:
+        try: os.remove(tmpname)
+        except EnvironmentError: pass
+
+def loadCachedTable(filename, magic, length, numBytes):
+    """
+    Memory-maps a table written by saveCachedTable and returns a read-only
+    buffer over its numBytes bytes of data.  Returns None, so the caller
+    rebuilds the table, if there is no such file or it cannot be read, is
+    truncated, or has a different magic string or length.
+    """
+    path = getCachePath(filename)
+    if path == None or not os.path.exists(path): return None
+    header = magic + struct.pack('<I', length)
+    try:
+        f = open(path, 'rb')
+        try:
+            if os.fstat(f.fileno()).st_size != len(header) + numBytes: return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally: f.close()
+    except (EnvironmentError, ValueError):
+        return None
+    if mapped[:len(header)] != header: return None
+    return buffer(mapped, len(header))
+
 def pause():
     """
     Pauses the output stream awaiting user feedback.